@@ -1,31 +1,150 @@
 import os
-from flask import Flask, jsonify
+import click
+from flask import Flask
 from flask_cors import CORS
 from dotenv import load_dotenv
-from waitress import serve
-from flask_migrate import Migrate
-from routes import teacher_bp
 
 load_dotenv()
 
-app = Flask(__name__)
-CORS(app) 
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
 
-app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL').strip()
 
-from models import db
-migrate = Migrate(app, db)
+def create_app():
+    """Build the Flask app.
 
-# Initialize the app with SQLAlchemy
-db.init_app(app)
+    Nothing here touches the database, so workers boot even while it is
+    unreachable. The schema is managed by migrations only:
+    `flask --app app db upgrade`.
+    """
+    from models import db
+    from routes import teacher_bp
+    from pool import engine_options_from_env, init_pool_metrics
+    from request_timing import init_request_timing
+    from metrics import init_metrics
+    from ingest import init_ingest_worker
+    from cache import create_cache_backend
+    from attendance_index import index_options_from_env
+    from partitions import partition_options_from_env
+    from services import stats_cache, attendance_index, attendance_partitions
+    from json_provider import init_json_provider
+    from compression import init_compression
+    from flask_migrate import Migrate
 
-# Register blueprints for routes
-app.register_blueprint(teacher_bp, url_prefix='/api/teacher')
+    app = Flask(__name__)
+    CORS(app)
+    # orjson-backed responses when it is installed, same bytes as the stdlib encoder
+    init_json_provider(app)
 
-# Initialize database
-with app.app_context():
-    db.create_all()
+    app.config['SQLALCHEMY_DATABASE_URI'] = os.environ.get('DATABASE_URL').strip()
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = engine_options_from_env()
+
+    # Initialize the app with SQLAlchemy
+    db.init_app(app)
+    init_pool_metrics(app, db)
+    init_request_timing(app)
+
+    # Registered for every app, not only under the `flask` CLI, so upgrade()
+    # and the other flask_migrate commands also work from scripts and tests
+    Migrate(app, db, directory=MIGRATIONS_DIR)
+
+    # Configure the course statistics cache
+    stats_cache.configure(create_cache_backend())
+
+    # Size the in-memory attendance index, off unless ATTENDANCE_INDEX_MAX_MB is set
+    attendance_index.configure(**index_options_from_env())
+
+    # Monthly attendance partitions, created ahead of the writes that need them
+    attendance_partitions.configure(**partition_options_from_env())
+
+    # Expose Prometheus metrics at /metrics
+    init_metrics(app, db, stats_cache)
+
+    # Apply attendance batches queued by POST /attendance in async mode
+    init_ingest_worker(app)
+
+    # gzip/br bodies; registered last so it runs before the timing and metrics hooks
+    init_compression(app)
+
+    # Register blueprints for routes
+    app.register_blueprint(teacher_bp, url_prefix='/api/teacher')
+
+    register_commands(app)
+    return app
+
+
+def register_commands(app):
+    """Maintenance commands"""
+
+    @app.cli.command('rebuild-attendance-summary')
+    @click.option('--course', 'course_code', default=None, help='Only rebuild this course.')
+    def rebuild_attendance_summary_command(course_code):
+        """Recompute the attendance summary counters from the attendance table"""
+        from services import rebuild_attendance_summary
+        rebuild_attendance_summary(course_code)
+        click.echo('Attendance summary rebuilt')
+
+    @app.cli.command('rebuild-daily-rollup')
+    @click.option('--course', 'course_code', default=None, help='Only rebuild this course.')
+    def rebuild_daily_rollup_command(course_code):
+        """Recompute the daily attendance rollups from the attendance table"""
+        from services import rebuild_daily_rollup
+        rebuild_daily_rollup(course_code)
+        click.echo('Daily rollup rebuilt')
+
+    @app.cli.command('low-attendance-report')
+    @click.option('--course', 'course_code', default=None, help='Only report this course.')
+    @click.option('--threshold', default=75.0, show_default=True, help='Attendance percentage below which students are reported.')
+    @click.option('--denominator', type=click.Choice(['classes', 'eligible']), default='eligible', show_default=True,
+                  help='Divide by every class, or only by classes held since the student enrolled.')
+    def low_attendance_report_command(course_code, threshold, denominator):
+        """Print the students below the threshold as one JSON line per course"""
+        import json
+        from models import db, Teacher
+        from services import get_low_attendance_students
+        course_codes = [course_code] if course_code else [code for (code,) in db.session.query(Teacher.course_code).order_by(Teacher.course_code)]
+        threshold = int(threshold) if threshold.is_integer() else threshold
+        for code in course_codes:
+            report = get_low_attendance_students(code, threshold=threshold, denominator=denominator, sort='percentage')
+            click.echo(json.dumps(report))
+
+    @app.cli.command('create-attendance-partitions')
+    @click.option('--months-ahead', type=int, default=None,
+                  help='Months past the current one to create [default: ATTENDANCE_PARTITION_MONTHS_AHEAD or 2].')
+    def create_attendance_partitions_command(months_ahead):
+        """Create the missing monthly attendance partitions, e.g. from a monthly cron job"""
+        from datetime import datetime, timezone
+        from models import db
+        from services import attendance_partitions
+        if months_ahead is not None:
+            attendance_partitions.configure(months_ahead, attendance_partitions.lock_timeout_ms)
+        attendance_partitions.ensure(db.engine, [datetime.now(timezone.utc)])
+        click.echo(f'{attendance_partitions.created} attendance partitions created')
+
+    @app.cli.command('archive-attendance')
+    @click.option('--before', required=True, type=click.DateTime(formats=['%Y-%m']), help='First month to keep, as YYYY-MM.')
+    @click.option('--drop', is_flag=True, help='Drop the partitions instead of moving them to the attendance_archive schema.')
+    def archive_attendance_command(before, drop):
+        """Detach the attendance partitions of every month before --before"""
+        from services import archive_attendance
+        try:
+            archived = archive_attendance(before, drop)
+        except ValueError as e:
+            raise click.BadParameter(str(e), param_hint='--before')
+        for name in archived:
+            click.echo(name)
+        click.echo(f"{len(archived)} attendance partitions {'dropped' if drop else 'archived'}")
+
+    @app.cli.command('ingest-worker')
+    @click.option('--once', is_flag=True, help='Apply the pending tickets and exit.')
+    def ingest_worker_command(once):
+        """Apply queued attendance tickets in the foreground"""
+        ingest_worker = app.extensions['attendance_ingest']
+        if once:
+            click.echo(f'{ingest_worker.run_once()} tickets applied')
+        else:
+            ingest_worker.run()
 
 
 if __name__ == "__main__":
-    serve(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    from serve import serve_waitress
+    serve_waitress(create_app())
@@ -0,0 +1,202 @@
+import os
+import sys
+import threading
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from settings import env_flag
+
+# Rough per-entry overheads used for the memory cap
+_STUDENT_OVERHEAD = 400
+_SESSION_OVERHEAD = 150
+
+
+def popcount(value):
+    return bin(value).count('1')
+
+
+class CourseIndex:
+    """Attendance of one course as one int bitset per student, bit i set when the
+    student attended the i-th session in start order.
+
+    stamp is the course version the index was loaded at, compared against the
+    database to detect writes made by other processes.
+    """
+
+    def __init__(self, stamp, sessions, students):
+        self.stamp = stamp
+        self.session_ids = [session_id for session_id, _ in sessions]
+        self.started = [started_at for _, started_at in sessions]
+        # [student_id, name, roll_no, first eligible session ordinal, bitset] in roll number order
+        self.students = [
+            [student_id, name, roll_no, self._first_eligible(enrolled_at), attended]
+            for student_id, roll_no, name, enrolled_at, attended in students
+        ]
+        self.positions = {student[0]: position for position, student in enumerate(self.students)}
+        # Readers must not see a session whose bits are only partly applied
+        self.lock = threading.Lock()
+
+    def _first_eligible(self, enrolled_at):
+        return bisect_left(self.started, enrolled_at) if enrolled_at is not None else 0
+
+    @property
+    def nbytes(self):
+        sessions = len(self.started)
+        return (
+            sessions * _SESSION_OVERHEAD
+            + len(self.students) * (_STUDENT_OVERHEAD + sys.getsizeof(1 << sessions))
+        )
+
+    def range_mask(self, start=None, end=None):
+        """Bitmask of the sessions started within [start, end] and their number"""
+        first = bisect_left(self.started, start) if start is not None else 0
+        last = bisect_right(self.started, end) if end is not None else len(self.started)
+        if last <= first:
+            return 0, 0
+        return ((1 << last) - 1) ^ ((1 << first) - 1), last - first
+
+    def student_counts(self, start=None, end=None, eligible=False):
+        """(student_id, name, roll_no, attended, classes) per student in roll number
+        order. classes is every class in the range, or with eligible=True only
+        those held after the student enrolled."""
+        with self.lock:
+            mask, total_classes = self.range_mask(start, end)
+            return [
+                (student_id, name, roll_no, popcount(attended & mask),
+                 popcount(mask >> first) if eligible else total_classes)
+                for student_id, name, roll_no, first, attended in self.students
+            ]
+
+    def course_totals(self, start=None, end=None):
+        """(total_classes, attended, possible attendance, total_students), where
+        possible attendance only counts sessions held after each student enrolled"""
+        with self.lock:
+            mask, total_classes = self.range_mask(start, end)
+            attended = 0
+            possible = 0
+            for _, _, _, first, student_attended in self.students:
+                attended += popcount(student_attended & mask)
+                possible += popcount(mask >> first)
+            return total_classes, attended, possible, len(self.students)
+
+    def append_sessions(self, version, sessions):
+        """Add sessions written by this process in one transaction, given as
+        (session_id, started_at, student_ids), along with the version it left
+        the course at. Returns False when another write came in between, in
+        which case the index has to be reloaded."""
+        with self.lock:
+            return self._append_sessions(version, sessions)
+
+    def _append_sessions(self, version, sessions):
+        # Each write transaction advances the version once
+        if self.stamp + 1 != version:
+            return False
+        for session_id, started_at, student_ids in sessions:
+            # Out of order, or already picked up when the index was loaded
+            if self.started and started_at < self.started[-1] or session_id in self.session_ids:
+                return False
+            if any(student_id not in self.positions for student_id in student_ids):
+                return False
+            bit = 1 << len(self.started)
+            self.session_ids.append(session_id)
+            self.started.append(started_at)
+            for student_id in student_ids:
+                self.students[self.positions[student_id]][4] |= bit
+        self.stamp = version
+        return True
+
+
+class AttendanceIndex:
+    """LRU of per-course bitset indexes under a memory cap, disabled until
+    configured.
+
+    With validate on, every lookup compares the index stamp with the database,
+    one primary key query, so writes from other processes trigger a reload.
+    """
+
+    def __init__(self):
+        self.max_bytes = 0
+        self.validate = True
+        self.hits = 0
+        self.loads = 0
+        self.evictions = 0
+        self._courses = OrderedDict()
+        self._lock = threading.Lock()
+
+    def configure(self, max_bytes, validate=True):
+        self.max_bytes = max_bytes
+        self.validate = validate
+        self.clear()
+
+    @property
+    def enabled(self):
+        return self.max_bytes > 0
+
+    def get(self, course_code, stamp, load):
+        """The index of a course, loading it with load(course_code) when missing
+        or stale. stamp(course_code) reads the current stamp. Returns None when
+        the course does not exist."""
+        with self._lock:
+            index = self._courses.get(course_code)
+            if index is not None:
+                self._courses.move_to_end(course_code)
+        if index is not None and (not self.validate or index.stamp == stamp(course_code)):
+            with self._lock:
+                self.hits += 1
+            return index
+
+        index = load(course_code)
+        with self._lock:
+            self.loads += 1
+            if index is None:
+                self._courses.pop(course_code, None)
+                return None
+            self._courses[course_code] = index
+            self._courses.move_to_end(course_code)
+            self._evict()
+        return index
+
+    def _evict(self):
+        # Always keep the most recent course, even if it alone is over the cap
+        total = sum(index.nbytes for index in self._courses.values())
+        while total > self.max_bytes and len(self._courses) > 1:
+            _, index = self._courses.popitem(last=False)
+            total -= index.nbytes
+            self.evictions += 1
+
+    def record_sessions(self, course_code, version, sessions):
+        """Apply committed sessions to a loaded index, or drop it if they cannot be appended"""
+        if not self.enabled:
+            return
+        with self._lock:
+            index = self._courses.get(course_code)
+            if index is not None and not index.append_sessions(version, sessions):
+                del self._courses[course_code]
+
+    def invalidate(self, course_code):
+        with self._lock:
+            self._courses.pop(course_code, None)
+
+    def clear(self):
+        with self._lock:
+            self._courses.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'enabled': self.enabled,
+                'courses': len(self._courses),
+                'bytes': sum(index.nbytes for index in self._courses.values()),
+                'max_bytes': self.max_bytes,
+                'hits': self.hits,
+                'loads': self.loads,
+                'evictions': self.evictions
+            }
+
+
+def index_options_from_env():
+    """AttendanceIndex.configure arguments from ATTENDANCE_INDEX_* environment variables"""
+    return {
+        'max_bytes': int(float(os.environ.get('ATTENDANCE_INDEX_MAX_MB', 0)) * 1024 * 1024),
+        'validate': env_flag('ATTENDANCE_INDEX_VALIDATE', True),
+    }
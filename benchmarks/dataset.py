@@ -0,0 +1,143 @@
+"""Generate a synthetic campus for the benchmarks.
+
+    DATABASE_URL=postgresql://localhost/teacher_bench python benchmarks/dataset.py \
+        --courses 20 --students 300 --sessions 45 --seed 1
+
+Courses are named <prefix>000, <prefix>001, ... and replace any existing course
+with the same code. Rows are inserted in bulk, then the attendance summary and
+daily rollups are rebuilt, so every read path sees what marking attendance
+would have left behind. The same arguments and seed give the same dataset.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+INSERT_CHUNK = 10000
+# Monday, Wednesday and Friday classes
+CLASS_DAYS = (0, 2, 4)
+
+
+def _uuid(rng):
+    return str(uuid.UUID(int=rng.getrandbits(128), version=4))
+
+
+def session_times(semester_start, sessions, course_number):
+    """Start times of a course's sessions, three a week, each course at its own hour"""
+    hour = 8 + course_number % 9
+    return [
+        semester_start + timedelta(weeks=ordinal // len(CLASS_DAYS), days=CLASS_DAYS[ordinal % len(CLASS_DAYS)], hours=hour)
+        for ordinal in range(sessions)
+    ]
+
+
+def generate_course(rng, args, course_number):
+    """Rows of one course: (teacher, students, sessions, attendance)"""
+    course_code = f'{args.prefix}{course_number:03d}'
+    teacher = {
+        'course_code': course_code,
+        'Teacher': [f'teacher{course_number % args.teachers}@campus.test'],
+        'TA': [f'ta{course_number}@campus.test'],
+        'total_classes': 0,
+    }
+    started = session_times(args.semester_start, args.sessions, course_number)
+    sessions = [{'id': _uuid(rng), 'course_code': course_code, 'started_at': started_at} for started_at in started]
+
+    students = []
+    attendance = []
+    for number in range(args.students):
+        student_id = _uuid(rng)
+        # Late enrollers join just before a class somewhere in the first half of the semester
+        first = rng.randrange(1, max(2, args.sessions // 2)) if rng.random() < args.late_enrollment else 0
+        enrolled_at = started[first] - timedelta(hours=1) if first else args.semester_start - timedelta(days=1)
+        students.append({
+            '_id': student_id,
+            'course_code': course_code,
+            'roll_no': f'{course_code}-{number:04d}',
+            'name': f'Student {course_number}-{number}',
+            'enrolled_at': enrolled_at,
+        })
+        # Most students attend over 80% of their classes, a tail falls well below 75%
+        propensity = rng.betavariate(args.attendance_alpha, args.attendance_beta)
+        for session in sessions[first:]:
+            if rng.random() < propensity:
+                attendance.append({
+                    'id': _uuid(rng),
+                    'student_id': student_id,
+                    'session_id': session['id'],
+                    'class_date': session['started_at'],
+                })
+    return teacher, students, sessions, attendance
+
+
+def _insert(model, rows):
+    from sqlalchemy import insert
+    from models import db
+    for offset in range(0, len(rows), INSERT_CHUNK):
+        db.session.execute(insert(model), rows[offset:offset + INSERT_CHUNK])
+
+
+def generate(args):
+    from sqlalchemy import delete
+    from models import db, Teacher, Student, ClassSession, Attendance
+    from services import rebuild_attendance_summary, rebuild_daily_rollup, attendance_partitions
+
+    # Partitions have to exist before the first write of the run
+    attendance_partitions.ensure(db.engine, [
+        started_at for course_number in range(args.courses)
+        for started_at in session_times(args.semester_start, args.sessions, course_number)
+    ])
+    rng = random.Random(args.seed)
+    totals = {'courses': 0, 'students': 0, 'sessions': 0, 'attendance': 0}
+    for course_number in range(args.courses):
+        teacher, students, sessions, attendance = generate_course(rng, args, course_number)
+        db.session.execute(delete(Teacher).where(Teacher.course_code == teacher['course_code']))
+        _insert(Teacher, [teacher])
+        _insert(Student, students)
+        _insert(ClassSession, sessions)
+        _insert(Attendance, attendance)
+        db.session.commit()
+        rebuild_attendance_summary(teacher['course_code'])
+        rebuild_daily_rollup(teacher['course_code'])
+
+        totals['courses'] += 1
+        totals['students'] += len(students)
+        totals['sessions'] += len(sessions)
+        totals['attendance'] += len(attendance)
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--courses', type=int, default=10)
+    parser.add_argument('--students', type=int, default=200, help='Students per course')
+    parser.add_argument('--sessions', type=int, default=40, help='Class sessions per course')
+    parser.add_argument('--teachers', type=int, default=5, help='Distinct teachers, each teaching every n-th course')
+    parser.add_argument('--late-enrollment', type=float, default=0.1, help='Fraction of students enrolling mid-semester')
+    parser.add_argument('--attendance-alpha', type=float, default=6.0, help='Beta distribution of per-student attendance rates')
+    parser.add_argument('--attendance-beta', type=float, default=1.2)
+    parser.add_argument('--semester-start', type=datetime.fromisoformat, default=datetime(2025, 1, 6))
+    parser.add_argument('--prefix', default='SYN', help='Course code prefix, at most 7 characters')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+    if len(args.prefix) > 7:
+        parser.error('--prefix must be at most 7 characters')
+
+    from app import create_app
+    app = create_app()
+    started = time.perf_counter()
+    with app.app_context():
+        totals = generate(args)
+    print(
+        f"{totals['courses']} courses, {totals['students']} students, {totals['sessions']} sessions, "
+        f"{totals['attendance']} attendance rows in {time.perf_counter() - started:.1f}s"
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Drive a running server with concurrent clients and report latency percentiles.
+
+    python benchmarks/load.py --base-url http://localhost:8000/api/teacher \
+        --course CS101 --email teacher@example.com --concurrency 32 --requests 2000
+"""
+import argparse
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+
+def percentile(sorted_values, fraction):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(fraction * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+def run(url, concurrency, total_requests):
+    session = requests.Session()
+    adapter = requests.adapters.HTTPAdapter(pool_connections=concurrency, pool_maxsize=concurrency)
+    session.mount('http://', adapter)
+
+    def timed_get(_):
+        started = time.perf_counter()
+        response = session.get(url)
+        return time.perf_counter() - started, response.status_code
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as pool:
+        results = list(pool.map(timed_get, range(total_requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _ in results)
+    errors = sum(1 for _, status in results if status >= 400)
+    return {
+        'requests': total_requests,
+        'errors': errors,
+        'throughput': total_requests / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--base-url', default='http://localhost:8000/api/teacher')
+    parser.add_argument('--course', required=True)
+    parser.add_argument('--email', required=True)
+    parser.add_argument('--concurrency', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=2000)
+    args = parser.parse_args()
+
+    endpoints = {
+        '/courses': f"{args.base_url}/courses?email={args.email}",
+        '/percentage': f"{args.base_url}/attendance/stats/course/{args.course}/percentage",
+    }
+    print(f"{'endpoint':<14}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'errors':>8}")
+    for name, url in endpoints.items():
+        result = run(url, args.concurrency, args.requests)
+        print(f"{name:<14}{result['throughput']:>10.1f}{result['p50_ms']:>10.1f}"
+              f"{result['p95_ms']:>10.1f}{result['p99_ms']:>10.1f}{result['errors']:>8}")
+
+
+if __name__ == "__main__":
+    main()
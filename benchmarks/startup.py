@@ -0,0 +1,72 @@
+"""Measure cold start: app import, create_app() and first-request latency.
+
+    DATABASE_URL=postgresql://... python benchmarks/startup.py --runs 10 \
+        --path /api/teacher/test --path "/api/teacher/courses?email=teacher@example.com"
+
+Every run starts a fresh interpreter, like a new container or worker would.
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHILD = """
+import json, sys, time
+started = time.perf_counter()
+import app
+imported = time.perf_counter()
+application = app.create_app()
+created = time.perf_counter()
+client = application.test_client()
+requests = []
+for path in sys.argv[1:]:
+    before = time.perf_counter()
+    status = client.get(path).status_code
+    requests.append((path, status, time.perf_counter() - before))
+print(json.dumps({
+    'import_ms': (imported - started) * 1000,
+    'create_app_ms': (created - imported) * 1000,
+    'requests': [[path, status, elapsed * 1000] for path, status, elapsed in requests],
+}))
+"""
+
+
+def run_once(paths):
+    started = time.perf_counter()
+    output = subprocess.run(
+        [sys.executable, '-c', CHILD] + paths,
+        cwd=REPO, check=True, capture_output=True, text=True
+    ).stdout
+    result = json.loads(output.strip().splitlines()[-1])
+    result['process_ms'] = (time.perf_counter() - started) * 1000
+    return result
+
+
+def summarize(name, values):
+    return f"{name:<52}{statistics.median(values):>10.1f}{min(values):>10.1f}{max(values):>10.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', action='append', dest='paths', help='Request path, repeat for several (default /api/teacher/test)')
+    args = parser.parse_args()
+    paths = args.paths or ['/api/teacher/test']
+
+    results = [run_once(paths) for _ in range(args.runs)]
+    print(f"{'':<52}{'median ms':>10}{'min':>10}{'max':>10}")
+    print(summarize('import app', [r['import_ms'] for r in results]))
+    print(summarize('create_app()', [r['create_app_ms'] for r in results]))
+    for position, path in enumerate(paths):
+        statuses = {r['requests'][position][1] for r in results}
+        print(summarize(f"first GET {path[:34]} {sorted(statuses)}", [r['requests'][position][2] for r in results]))
+    print(summarize('whole process', [r['process_ms'] for r in results]))
+
+
+if __name__ == '__main__':
+    main()
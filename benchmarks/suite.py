@@ -0,0 +1,256 @@
+"""Benchmark every read endpoint against a generated dataset, in-process.
+
+    DATABASE_URL=postgresql://localhost/teacher_bench python benchmarks/dataset.py
+    DATABASE_URL=postgresql://localhost/teacher_bench python benchmarks/suite.py \
+        --concurrency 8 --requests 200 --json after.json --compare before.json
+
+Requests go through the Flask test client, or with --server waitress through a
+waitress server on a free local port. Each endpoint is driven on its own by
+--concurrency client threads, with courses, students and date ranges picked at
+random (seeded) from the courses matching --prefix. The SQL statement count of
+every request is read from its Server-Timing header.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import re
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from load import percentile
+
+API = '/api/teacher'
+QUERIES = re.compile(r'desc="(\d+) queries"')
+
+
+class Dataset:
+    """Courses, staff, students and session dates the scenarios pick from"""
+
+    def __init__(self, prefix, students_per_course=50):
+        from sqlalchemy import func
+        from models import db, Teacher, Student, ClassSession
+
+        courses = (
+            db.session.query(Teacher.course_code, Teacher.Teacher)
+            .filter(Teacher.course_code.like(f'{prefix}%'))
+            .order_by(Teacher.course_code)
+            .all()
+        )
+        if not courses:
+            raise SystemExit(f"No courses starting with {prefix!r}, run benchmarks/dataset.py first")
+        self.courses = [course_code for course_code, _ in courses]
+        self.emails = sorted({email for _, staff in courses for email in staff})
+        self.students = {}
+        self.sessions = {}
+        for course_code in self.courses:
+            rows = (
+                db.session.query(Student._id, Student.roll_no)
+                .filter(Student.course_code == course_code)
+                .order_by(Student.roll_no)
+                .limit(students_per_course)
+                .all()
+            )
+            self.students[course_code] = [tuple(row) for row in rows]
+            self.sessions[course_code] = (
+                db.session.query(func.min(ClassSession.started_at), func.max(ClassSession.started_at))
+                .filter(ClassSession.course_code == course_code)
+                .one()
+            )
+
+    def date_range(self, rng, course_code):
+        """A random sub-range of the course's semester, as ISO strings"""
+        first, last = self.sessions[course_code]
+        if first is None:
+            first = last = datetime(2025, 1, 1)
+        start = first + (last - first) * (rng.random() * 0.5)
+        end = start + (last - start) * (0.25 + rng.random() * 0.75)
+        return start.isoformat(), end.isoformat()
+
+
+def _course_stats_range(data, rng):
+    course_code = rng.choice(data.courses)
+    start, end = data.date_range(rng, course_code)
+    return 'GET', f'{API}/attendance/stats/course/{course_code}?start_date={start}&end_date={end}', None
+
+
+def _batch_stats(data, rng):
+    course_codes = rng.sample(data.courses, min(5, len(data.courses)))
+    return 'GET', f"{API}/attendance/stats/courses?course_codes={','.join(course_codes)}", None
+
+
+def _mark_attendance(data, rng):
+    course_code = rng.choice(data.courses)
+    roll_numbers = [roll_no for _, roll_no in data.students[course_code] if rng.random() < 0.8]
+    return 'POST', f'{API}/attendance', {'course_code': course_code, 'roll_numbers': roll_numbers}
+
+
+# name -> function(dataset, rng) returning (method, path, json body)
+SCENARIOS = {
+    'courses': lambda data, rng: ('GET', f'{API}/courses?email={rng.choice(data.emails)}', None),
+    'students': lambda data, rng: ('GET', f'{API}/courses/{rng.choice(data.courses)}/students?limit=100', None),
+    'student_stats': lambda data, rng: (
+        'GET', f'{API}/attendance/stats/{rng.choice(data.students[rng.choice(data.courses)])[0]}', None
+    ),
+    'course_stats': lambda data, rng: ('GET', f'{API}/attendance/stats/course/{rng.choice(data.courses)}', None),
+    'course_stats_range': _course_stats_range,
+    'batch_stats': _batch_stats,
+    'low_attendance': lambda data, rng: ('GET', f'{API}/attendance/{rng.choice(data.courses)}/low?limit=50', None),
+    'percentage': lambda data, rng: (
+        'GET', f'{API}/attendance/stats/course/{rng.choice(data.courses)}/percentage', None
+    ),
+    'export_csv': lambda data, rng: ('GET', f'{API}/courses/{rng.choice(data.courses)}/attendance/export', None),
+    'mark_attendance': _mark_attendance,
+}
+# Writes change the dataset, so they only run when asked for
+WRITE_SCENARIOS = ('mark_attendance',)
+
+
+def test_client_sender(app):
+    """send(method, path, body) -> (status, Server-Timing header) through per-thread test clients"""
+    local = threading.local()
+
+    def send(method, path, body):
+        if not hasattr(local, 'client'):
+            local.client = app.test_client()
+        response = local.client.open(path, method=method, json=body)
+        response.get_data()
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+    return send
+
+
+def waitress_sender(app, threads):
+    """Serve the app with waitress on a free local port, send requests over HTTP"""
+    import requests
+    from waitress import create_server
+
+    # Queue depth warnings are expected when the clients outnumber the threads
+    logging.getLogger('waitress.queue').setLevel(logging.ERROR)
+    server = create_server(app, host='127.0.0.1', port=0, threads=threads)
+    threading.Thread(target=server.run, name='benchmark-waitress', daemon=True).start()
+    base_url = f'http://127.0.0.1:{server.effective_port}'
+    session = requests.Session()
+    session.mount('http://', requests.adapters.HTTPAdapter(pool_connections=threads, pool_maxsize=threads))
+
+    def send(method, path, body):
+        response = session.request(method, base_url + path, json=body)
+        return response.status_code, response.headers.get('Server-Timing', '')
+
+    return send
+
+
+def run_scenario(send, scenario, data, seed, concurrency, total_requests, warmup):
+    rng = random.Random(seed)
+    planned = [scenario(data, rng) for _ in range(warmup + total_requests)]
+
+    def timed(request):
+        method, path, body = request
+        started = time.perf_counter()
+        status, server_timing = send(method, path, body)
+        queries = QUERIES.search(server_timing)
+        return time.perf_counter() - started, status, int(queries.group(1)) if queries else None
+
+    with ThreadPoolExecutor(concurrency) as pool:
+        list(pool.map(timed, planned[:warmup]))
+        started = time.perf_counter()
+        results = list(pool.map(timed, planned[warmup:]))
+        elapsed = time.perf_counter() - started
+
+    latencies = sorted(latency for latency, _, _ in results)
+    queries = [count for _, _, count in results if count is not None]
+    return {
+        'requests': total_requests,
+        'errors': sum(1 for _, status, _ in results if status >= 400),
+        'throughput': total_requests / elapsed,
+        'p50_ms': percentile(latencies, 0.50) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'sql_mean': sum(queries) / len(queries) if queries else None,
+        'sql_max': max(queries) if queries else None,
+    }
+
+
+def compare(results, baseline, tolerance):
+    """Endpoints whose p95 grew by more than tolerance or that issue more SQL statements"""
+    regressions = []
+    for name, result in results.items():
+        before = baseline.get(name)
+        if before is None:
+            continue
+        if result['p95_ms'] > before['p95_ms'] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {before['p95_ms']:.1f} -> {result['p95_ms']:.1f} ms")
+        if result['sql_mean'] is not None and before.get('sql_mean') is not None and result['sql_mean'] > before['sql_mean'] + 0.5:
+            regressions.append(f"{name}: SQL statements {before['sql_mean']:.1f} -> {result['sql_mean']:.1f} per request")
+    return regressions
+
+
+def _format_sql(value, digits):
+    return f'{value:.{digits}f}' if value is not None else '-'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--prefix', default='SYN', help='Course code prefix of the generated dataset')
+    parser.add_argument('--endpoints', help=f"Comma separated subset of: {', '.join(SCENARIOS)}")
+    parser.add_argument('--writes', action='store_true', help='Also run the scenarios that write attendance')
+    parser.add_argument('--server', choices=('test-client', 'waitress'), default='test-client')
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--requests', type=int, default=200, help='Measured requests per endpoint')
+    parser.add_argument('--warmup', type=int, default=20, help='Unmeasured requests per endpoint')
+    parser.add_argument('--cache', action='store_true', help='Keep the statistics cache on (off by default so every request is computed)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--json', help='Write the results to this file')
+    parser.add_argument('--compare', help='Results file of an earlier run to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='Allowed relative p95 increase (default 0.25)')
+    args = parser.parse_args()
+
+    names = args.endpoints.split(',') if args.endpoints else [
+        name for name in SCENARIOS if args.writes or name not in WRITE_SCENARIOS
+    ]
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown endpoints: {', '.join(unknown)}")
+
+    os.environ.setdefault('STATS_CACHE_BACKEND', 'memory' if args.cache else 'none')
+    os.environ.setdefault('ATTENDANCE_INGEST_WORKER', '0')
+    os.environ['REQUEST_TIMING'] = '1'
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        data = Dataset(args.prefix)
+    if args.server == 'waitress':
+        send = waitress_sender(app, args.concurrency)
+    else:
+        send = test_client_sender(app)
+
+    print(f"{len(data.courses)} courses, {args.server}, {args.concurrency} clients, {args.requests} requests per endpoint")
+    print(f"{'endpoint':<20}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'SQL':>8}{'max':>6}{'errors':>8}")
+    results = {}
+    for name in names:
+        result = run_scenario(send, SCENARIOS[name], data, args.seed, args.concurrency, args.requests, args.warmup)
+        results[name] = result
+        print(f"{name:<20}{result['throughput']:>10.1f}{result['p50_ms']:>10.1f}{result['p95_ms']:>10.1f}"
+              f"{result['p99_ms']:>10.1f}{_format_sql(result['sql_mean'], 1):>8}{_format_sql(result['sql_max'], 0):>6}"
+              f"{result['errors']:>8}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
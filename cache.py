@@ -0,0 +1,145 @@
+import os
+import json
+import time
+import threading
+from collections import OrderedDict
+from functools import wraps
+
+
+class LRUCache:
+    """In-process LRU cache with a per-entry TTL, safe to share between threads"""
+
+    def __init__(self, max_entries=1024, ttl=30):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class RedisCache:
+    """Redis-compatible backend, shared between every worker process"""
+
+    def __init__(self, url, ttl=30, prefix='teacher:stats:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("The redis package is required for the redis cache backend")
+        self.client = redis.Redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return json.loads(value) if value is not None else None
+
+    def set(self, key, value):
+        self.client.set(self.prefix + key, json.dumps(value), ex=self.ttl)
+
+
+class StatsCache:
+    """Read-through cache for per-course statistics, disabled until a backend
+    is configured.
+
+    Entries are keyed by function, course and date range plus the course's
+    version stamp, read by get_version(course_code) from the database. Every
+    write advances the stamp in its own transaction, so entries of a course
+    are skipped from then on by every process, whichever one wrote, and age
+    out through LRU/TTL.
+    """
+
+    def __init__(self, backend=None, get_version=None):
+        self.backend = backend
+        self.get_version = get_version
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def configure(self, backend):
+        self.backend = backend
+
+    @property
+    def enabled(self):
+        return self.backend is not None
+
+    def _key(self, name, course_code, start_date, end_date, options=None):
+        stamp = self.get_version(course_code)
+        # None for a missing course, whose error results are not cached anyway
+        version = f'{stamp[0]}@{stamp[1].isoformat()}' if stamp is not None else '-'
+        start = start_date.isoformat() if start_date else ''
+        end = end_date.isoformat() if end_date else ''
+        key = f"{name}:{course_code}:{version}:{start}:{end}"
+        if options:
+            key += ':' + json.dumps(options, sort_keys=True)
+        return key
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def cached(self, name):
+        """Decorate a fn(course_code, start_date=None, end_date=None, **options)
+        returning a dict, options are part of the key"""
+        def decorator(func):
+            @wraps(func)
+            def wrapper(course_code, start_date=None, end_date=None, **options):
+                if not self.enabled:
+                    return func(course_code, start_date, end_date, **options)
+
+                key = self._key(name, course_code, start_date, end_date, options)
+                value = self.backend.get(key)
+                if value is not None:
+                    self._count('hits')
+                    return value
+
+                self._count('misses')
+                value = func(course_code, start_date, end_date, **options)
+                # Error tuples and other non-dict results are never cached
+                if isinstance(value, dict):
+                    self.backend.set(key, value)
+                return value
+            return wrapper
+        return decorator
+
+    def stats(self):
+        return {
+            'backend': type(self.backend).__name__ if self.backend else None,
+            'hits': self.hits,
+            'misses': self.misses
+        }
+
+
+def create_cache_backend():
+    """Build the stats cache backend from STATS_CACHE_* environment variables"""
+    backend = os.environ.get('STATS_CACHE_BACKEND', 'memory').strip().lower()
+    ttl = int(os.environ.get('STATS_CACHE_TTL', 30))
+
+    if backend == 'none':
+        return None
+    if backend == 'redis':
+        return RedisCache(os.environ['STATS_CACHE_REDIS_URL'].strip(), ttl=ttl)
+    return LRUCache(
+        max_entries=int(os.environ.get('STATS_CACHE_MAX_ENTRIES', 1024)),
+        ttl=ttl
+    )
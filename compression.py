@@ -0,0 +1,145 @@
+import os
+import time
+import zlib
+
+from flask import request
+
+from settings import env_flag
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Text bodies worth compressing, exports in binary formats are compressed already
+COMPRESSIBLE_MIMETYPES = frozenset({'application/json', 'application/x-ndjson', 'text/csv', 'text/plain'})
+STREAM_FLUSH_BYTES = 64 * 1024
+STREAM_FLUSH_INTERVAL = 0.05
+
+
+class _Gzip:
+    name = 'gzip'
+
+    def __init__(self, level):
+        # wbits 31 writes the gzip container rather than a raw zlib stream
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data):
+        return self._compressor.compress(data)
+
+    def flush(self):
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _Brotli:
+    name = 'br'
+
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data):
+        return self._compressor.process(data)
+
+    def flush(self):
+        return self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+class _CompressedStream:
+    """Streamed body compressed as it is produced.
+
+    Output is flushed every STREAM_FLUSH_BYTES of input, or as soon as a chunk
+    arrives more than STREAM_FLUSH_INTERVAL after the last flush, so slow
+    streams still reach the client line by line while fast ones compress well.
+    """
+
+    def __init__(self, response, compressor):
+        self._source = response.response
+        self._chunks = response.iter_encoded()
+        self._compressor = compressor
+
+    def __iter__(self):
+        compressor = self._compressor
+        pending = 0
+        last_flush = time.monotonic()
+        for chunk in self._chunks:
+            data = compressor.compress(chunk)
+            pending += len(chunk)
+            now = time.monotonic()
+            if pending >= STREAM_FLUSH_BYTES or now - last_flush >= STREAM_FLUSH_INTERVAL:
+                data += compressor.flush()
+                pending = 0
+                last_flush = now
+            if data:
+                yield data
+        yield compressor.finish()
+
+    def close(self):
+        # Closing the original body ends its stream_with_context request context
+        close = getattr(self._source, 'close', None)
+        if close is not None:
+            close()
+
+
+def compression_options_from_env():
+    """Compression settings from the environment, None when turned off"""
+    if not env_flag('RESPONSE_COMPRESSION', True):
+        return None
+    return {
+        'min_bytes': int(os.environ.get('COMPRESSION_MIN_BYTES', 1024)),
+        'gzip_level': int(os.environ.get('GZIP_LEVEL', 6)),
+        'brotli_quality': int(os.environ.get('BROTLI_QUALITY', 4)),
+    }
+
+
+def init_compression(app):
+    """Compress text responses with br (when the brotli package is installed)
+    or gzip, whichever the client accepts.
+
+    Buffered bodies are compressed when they are at least COMPRESSION_MIN_BYTES
+    long, streamed ones (NDJSON, exports) always, as they are produced.
+    RESPONSE_COMPRESSION=0 turns it off.
+    """
+    options = compression_options_from_env()
+    if options is None:
+        return
+
+    def choose_compressor():
+        accepted = request.accept_encodings
+        if brotli is not None and accepted['br']:
+            return _Brotli(options['brotli_quality'])
+        if accepted['gzip']:
+            return _Gzip(options['gzip_level'])
+        return None
+
+    @app.after_request
+    def compress_response(response):
+        if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+            return response
+        response.vary.add('Accept-Encoding')
+        if (
+            request.method == 'HEAD'
+            or response.status_code < 200
+            or response.status_code in (204, 206, 304)
+            or 'Content-Encoding' in response.headers
+            or response.direct_passthrough
+        ):
+            return response
+        if not response.is_streamed and response.calculate_content_length() < options['min_bytes']:
+            return response
+
+        compressor = choose_compressor()
+        if compressor is None:
+            return response
+        if response.is_streamed:
+            response.response = _CompressedStream(response, compressor)
+            response.headers.pop('Content-Length', None)
+        else:
+            response.set_data(compressor.compress(response.get_data()) + compressor.finish())
+        response.headers['Content-Encoding'] = compressor.name
+        return response
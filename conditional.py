@@ -0,0 +1,91 @@
+import hashlib
+from datetime import datetime, timedelta, timezone
+from functools import wraps
+
+from flask import current_app, g, has_app_context, jsonify, make_response, request
+from werkzeug.http import is_resource_modified
+
+# HTTP dates have one second resolution, so a course written again within the
+# second it was served would look unmodified. Last-Modified is only sent, and
+# If-Modified-Since only honoured, once the last write has settled; until then
+# the ETag alone decides.
+LAST_MODIFIED_SETTLE = timedelta(seconds=2)
+
+
+def _as_utc(value):
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def course_validators(versions):
+    """(ETag, Last-Modified) of a response built from the given courses.
+
+    versions maps each course code to its (version, modified_at) stamp, or to
+    None for a requested course that does not exist. The ETag covers all of
+    them, Last-Modified is the latest write, None while it has not settled.
+    """
+    digest = hashlib.blake2b(digest_size=12)
+    last_modified = None
+    for code in sorted(versions):
+        stamp = versions[code]
+        if stamp is None:
+            digest.update(f'{code}:-\n'.encode())
+            continue
+        version, modified_at = stamp
+        modified_at = _as_utc(modified_at)
+        digest.update(f'{code}:{version}:{modified_at.timestamp():.6f}\n'.encode())
+        if last_modified is None or modified_at > last_modified:
+            last_modified = modified_at
+    if last_modified is not None and datetime.now(timezone.utc) - last_modified < LAST_MODIFIED_SETTLE:
+        last_modified = None
+    return digest.hexdigest(), last_modified
+
+
+def request_course_versions():
+    """The versions mapping read by the conditional GET being served, empty
+    outside of one. Cached stats are keyed by the same stamps the ETag is
+    built from, instead of reading them a second time."""
+    return g.get('course_versions', {}) if has_app_context() else {}
+
+
+def conditional_response(versions, build_response):
+    """A 304 when the request's If-None-Match or If-Modified-Since still match
+    the given course versions, otherwise build_response(), whose successful
+    responses get a weak ETag so they stay valid whatever Content-Encoding
+    they are sent with"""
+    etag, last_modified = course_validators(versions)
+    g.course_versions = versions
+    if is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = make_response(build_response())
+        if response.status_code != 200:
+            return response
+    else:
+        response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    # Caches may keep the body but have to revalidate before every use
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def conditional(get_versions):
+    """Answer conditional GETs of a view from its courses' version stamps.
+
+    get_versions is called with the view's arguments and returns the versions
+    mapping of course_validators, or None to skip validation (missing course,
+    invalid request), in which case the view answers on its own. Matching
+    requests get their 304 before the view runs any query.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                versions = get_versions(*args, **kwargs)
+            except Exception as e:
+                return jsonify({'error': str(e)}), 500
+            if versions is None:
+                return view(*args, **kwargs)
+            return conditional_response(versions, lambda: view(*args, **kwargs))
+        return wrapper
+    return decorator
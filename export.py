@@ -0,0 +1,163 @@
+import io
+import csv
+import json
+import base64
+import importlib.util
+from bisect import bisect_left
+from itertools import islice
+
+EXPORT_FORMATS = {
+    'csv': ('text/csv', 'csv'),
+    'bitset': ('application/x-ndjson', 'ndjson'),
+    'arrow': ('application/vnd.apache.arrow.stream', 'arrows'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet'),
+}
+ARROW_FORMATS = ('arrow', 'parquet')
+
+
+def _batches(rows, size):
+    rows = iter(rows)
+    while True:
+        batch = list(islice(rows, size))
+        if not batch:
+            return
+        yield batch
+
+
+def _first_eligible(started, enrolled_at):
+    """Ordinal of the first session held after the student enrolled"""
+    return bisect_left(started, enrolled_at) if enrolled_at is not None else 0
+
+
+def _cells(attended, count, first, missed, present, not_enrolled):
+    """One cell per session, session 0 first. Sessions before the first eligible
+    one read as not_enrolled unless the student attended them anyway."""
+    bits = format(attended, f'0{count}b')[::-1] if count else ''
+    return [
+        present if bit == '1' else (missed if ordinal >= first else not_enrolled)
+        for ordinal, bit in enumerate(bits)
+    ]
+
+
+def csv_export(sessions, rows, chunk_size=500):
+    """One line per student and one column per session: 1 attended, 0 missed,
+    empty for sessions missed before the student enrolled"""
+    started = [started_at for _, started_at in sessions]
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(['student_id', 'roll_no', 'name'] + [started_at.isoformat() for started_at in started])
+
+    for batch in _batches(rows, chunk_size):
+        for student_id, roll_no, name, enrolled_at, attended in batch:
+            first = _first_eligible(started, enrolled_at)
+            writer.writerow([student_id, roll_no, name] + _cells(attended, len(started), first, '0', '1', ''))
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def bitset_export(sessions, rows, chunk_size=500):
+    """NDJSON: a header line listing the sessions, then one line per student with
+    the attended sessions packed into a little-endian bitset (bit i is session i),
+    base64 encoded, and the ordinal of the first session after enrollment"""
+    started = [started_at for _, started_at in sessions]
+    size = (len(sessions) + 7) // 8
+    yield json.dumps({
+        'sessions': [{'id': session_id, 'started_at': started_at.isoformat()} for session_id, started_at in sessions]
+    }) + '\n'
+
+    for batch in _batches(rows, chunk_size):
+        yield ''.join(
+            json.dumps({
+                'student_id': student_id,
+                'roll_no': roll_no,
+                'name': name,
+                'eligible_from': _first_eligible(started, enrolled_at),
+                'attended': base64.b64encode(attended.to_bytes(size, 'little')).decode('ascii')
+            }) + '\n'
+            for student_id, roll_no, name, enrolled_at, attended in batch
+        )
+
+
+class _ChunkSink:
+    """Write-only file that hands out what was written since the last drain"""
+
+    def __init__(self):
+        self.chunks = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def arrow_export(sessions, rows, chunk_size=500, format='arrow'):
+    """Arrow IPC stream or Parquet file with one boolean column per session, null
+    for sessions missed before the student enrolled. Each chunk of students is one
+    record batch or row group."""
+    # pyarrow takes a while to import, only load it once an export asks for it
+    try:
+        import pyarrow
+        import pyarrow.ipc
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError(f"The pyarrow package is required for the {format} export format")
+
+    started = [started_at for _, started_at in sessions]
+    schema = pyarrow.schema(
+        [('student_id', pyarrow.string()), ('roll_no', pyarrow.string()), ('name', pyarrow.string())]
+        + [(started_at.isoformat(), pyarrow.bool_()) for started_at in started]
+    )
+    sink = _ChunkSink()
+    if format == 'parquet':
+        writer = pyarrow.parquet.ParquetWriter(sink, schema)
+        write = writer.write_table
+        to_chunk = pyarrow.Table.from_arrays
+    else:
+        writer = pyarrow.ipc.new_stream(sink, schema)
+        write = writer.write_batch
+        to_chunk = pyarrow.RecordBatch.from_arrays
+
+    for batch in _batches(rows, chunk_size):
+        columns = [[row[0] for row in batch], [row[1] for row in batch], [row[2] for row in batch]]
+        cells = []
+        for _, _, _, enrolled_at, attended in batch:
+            first = _first_eligible(started, enrolled_at)
+            cells.append(_cells(attended, len(started), first, False, True, None))
+        columns += [list(column) for column in zip(*cells)] if started else []
+        write(to_chunk([pyarrow.array(column, type=field.type) for column, field in zip(columns, schema)], schema=schema))
+        yield sink.drain()
+
+    writer.close()
+    yield sink.drain()
+
+
+def format_available(format):
+    return format not in ARROW_FORMATS or importlib.util.find_spec('pyarrow') is not None
+
+
+def export_attendance_matrix(format, sessions, rows, chunk_size=500):
+    """Encode the rows of iter_attendance_matrix, one chunk of students at a time"""
+    if format in ARROW_FORMATS:
+        return arrow_export(sessions, rows, chunk_size, format)
+    if format == 'bitset':
+        return bitset_export(sessions, rows, chunk_size)
+    return csv_export(sessions, rows, chunk_size)
@@ -0,0 +1,35 @@
+import os
+import multiprocessing
+
+# Multi-process mode: SERVER=gunicorn python serve.py
+bind = f"{os.environ.get('HOST', '0.0.0.0')}:{os.environ.get('PORT', 8000)}"
+workers = int(os.environ.get('GUNICORN_WORKERS', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+worker_class = 'gthread'
+backlog = int(os.environ.get('GUNICORN_BACKLOG', 1024))
+timeout = int(os.environ.get('GUNICORN_TIMEOUT', 60))
+graceful_timeout = int(os.environ.get('GRACEFUL_TIMEOUT', 30))
+keepalive = int(os.environ.get('GUNICORN_KEEPALIVE', 5))
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 0))
+max_requests_jitter = int(os.environ.get('GUNICORN_MAX_REQUESTS_JITTER', 0))
+
+# Load the app once in the master, workers fork from it
+preload_app = True
+accesslog = '-'
+
+
+def _dispose_engine(server, close):
+    from models import db
+    # The app built by the preloaded create_app() call
+    with server.app.wsgi().app_context():
+        db.engine.dispose(close=close)
+
+
+def when_ready(server):
+    # Connections opened while loading the app must not be shared with workers
+    _dispose_engine(server, close=True)
+
+
+def post_fork(server, worker):
+    # Drop any pooled connection inherited from the master without closing the parent's socket
+    _dispose_engine(server, close=False)
@@ -0,0 +1,90 @@
+import os
+import time
+import logging
+import threading
+
+from flask import current_app
+
+from settings import env_flag
+
+logger = logging.getLogger('teacher.ingest')
+
+
+class IngestWorker:
+    """Background thread draining the attendance_ticket queue.
+
+    New tickets wake it immediately; it then lingers briefly so a burst of
+    submissions for the same course is coalesced into one write. Between bursts
+    it polls, so tickets left behind by a crashed process are still applied.
+    """
+
+    def __init__(self, app, poll_interval=1.0, linger=0.05, batch_size=200, in_process=True):
+        self.app = app
+        self.in_process = in_process
+        self.poll_interval = poll_interval
+        self.linger = linger
+        self.batch_size = batch_size
+        self._wake = threading.Event()
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def ensure_started(self):
+        """Start the thread in this process, again after a fork"""
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            threading.Thread(target=self.run, name='attendance-ingest', daemon=True).start()
+
+    def wake(self):
+        """Apply queued tickets now, starting the thread on first use when
+        this process runs the worker"""
+        if self.in_process:
+            self.ensure_started()
+        self._wake.set()
+
+    def run_once(self):
+        from services import apply_pending_tickets
+        with self.app.app_context():
+            return apply_pending_tickets(self.batch_size)
+
+    def run(self):
+        while True:
+            try:
+                processed = self.run_once()
+            except Exception:
+                logger.exception("Applying attendance tickets failed")
+                processed = 0
+            # A full batch means there is more waiting, keep going without sleeping
+            if processed < self.batch_size:
+                if self._wake.wait(self.poll_interval):
+                    time.sleep(self.linger)
+                self._wake.clear()
+
+
+def init_ingest_worker(app):
+    """Set up the worker applying POST /attendance batches queued in async mode.
+
+    The worker thread starts when a process first queues a ticket, or is
+    asked about a pending one, so processes that never see async mode do not
+    poll the queue. Set ATTENDANCE_INGEST_WORKER=0 to leave the queue to a
+    dedicated `flask ingest-worker` process instead.
+    """
+    worker = IngestWorker(
+        app,
+        poll_interval=float(os.environ.get('ATTENDANCE_INGEST_POLL', 1.0)),
+        linger=float(os.environ.get('ATTENDANCE_INGEST_LINGER_MS', 50)) / 1000,
+        batch_size=int(os.environ.get('ATTENDANCE_INGEST_BATCH_SIZE', 200)),
+        in_process=env_flag('ATTENDANCE_INGEST_WORKER', True),
+    )
+    app.extensions['attendance_ingest'] = worker
+    return worker
+
+
+def wake_ingest_worker():
+    """Tell this process's worker that a ticket was queued"""
+    worker = current_app.extensions.get('attendance_ingest')
+    if worker is not None:
+        worker.wake()
@@ -0,0 +1,76 @@
+import re
+
+from flask.json.provider import DefaultJSONProvider
+
+from settings import env_flag
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Everything Flask's encoder does not leave to orjson: datetimes become HTTP dates
+# and dataclasses go through asdict, both via DefaultJSONProvider.default
+_ORJSON_OPTIONS = (
+    (orjson.OPT_SORT_KEYS | orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS)
+    if orjson is not None else 0
+)
+# json.dumps(ensure_ascii=True) escapes everything outside space..tilde that
+# orjson writes as is: DEL and every non-ASCII character
+_NON_ASCII = re.compile('[\x7f-\U0010ffff]')
+# Floats repr() writes differently: orjson puts numbers below 1e-4 in positional
+# notation (0.0000...), and leaves the '+' and the zero padding out of exponents.
+# Output with either sends the object to the stdlib encoder. The same text
+# inside a string only costs the fast path.
+_SMALL_FLOAT = b'0.0000'
+_EXPONENT = re.compile(rb'e-?[0-9]+(?:[,\]}]|$)')
+
+
+def _escape(match):
+    code = ord(match.group())
+    if code > 0xFFFF:
+        code -= 0x10000
+        return '\\u{:04x}\\u{:04x}'.format(0xD800 | (code >> 10), 0xDC00 | (code & 0x3FF))
+    return '\\u{:04x}'.format(code)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider encoding responses with orjson.
+
+    The bytes match DefaultJSONProvider's compact output: sorted keys, no
+    whitespace, ASCII only, HTTP dates for datetimes. Objects orjson cannot
+    encode the same way (integers beyond 64 bits, non-string keys) and debug
+    mode's indented output go through the stdlib encoder.
+
+    Floats below 1e-4 or from 1e16 up, where repr() uses an exponent, go
+    through the stdlib encoder as well. NaN and infinity still come out as
+    null rather than the stdlib's invalid NaN and Infinity; the API never
+    returns them.
+    """
+
+    def _dumps_bytes(self, obj):
+        try:
+            data = orjson.dumps(obj, default=self.default, option=_ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            return None
+        if _SMALL_FLOAT in data or _EXPONENT.search(data):
+            return None
+        if not data.isascii() or b'\x7f' in data:
+            data = _NON_ASCII.sub(_escape, data.decode('utf-8')).encode('ascii')
+        return data
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        if (self.compact is None and self._app.debug) or self.compact is False:
+            return super().response(obj)
+        data = self._dumps_bytes(obj)
+        if data is None:
+            return super().response(obj)
+        return self._app.response_class(data + b'\n', mimetype=self.mimetype)
+
+
+def init_json_provider(app):
+    """Encode JSON responses with orjson when it is installed, unless FAST_JSON=0"""
+    if orjson is None or not env_flag('FAST_JSON', True):
+        return
+    app.json = FastJSONProvider(app)
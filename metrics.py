@@ -0,0 +1,189 @@
+import os
+import time
+import resource
+import threading
+from bisect import bisect_left
+
+from flask import Response, g, request
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(names, values, extra=None):
+    pairs = list(zip(names, values)) + (extra or [])
+    if not pairs:
+        return ''
+    escaped = (
+        '{}="{}"'.format(name, str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n'))
+        for name, value in pairs
+    )
+    return '{' + ','.join(escaped) + '}'
+
+
+def _format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(label, '') for label in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name + _format_labels(self.labels, key), value
+
+
+class Histogram:
+    """Cumulative histogram with fixed buckets and optional labels"""
+
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(label, '') for label in self.labels)
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            counts[index] += 1
+            self._values[key] = (counts, total + value)
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                yield self.name + '_bucket' + _format_labels(self.labels, key, [('le', _format_value(bound))]), cumulative
+            yield self.name + '_sum' + _format_labels(self.labels, key), total
+            yield self.name + '_count' + _format_labels(self.labels, key), cumulative
+
+
+class CallbackMetric:
+    """Single value read from a callback at scrape time, for numbers that are
+    already tracked elsewhere (cache counters, pool occupancy, memory)"""
+
+    def __init__(self, name, help, callback, type='gauge'):
+        self.name = name
+        self.help = help
+        self.callback = callback
+        self.type = type
+
+    def samples(self):
+        value = self.callback()
+        if value is not None:
+            yield self.name, value
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def register(self, metric):
+        """Add a metric, replacing one of the same name so every app built by
+        create_app() reports its own callbacks once"""
+        with self._lock:
+            self._metrics = [existing for existing in self._metrics if existing.name != metric.name]
+            self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Render every metric in the Prometheus text exposition format"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics)
+        for metric in metrics:
+            lines.append(f'# HELP {metric.name} {metric.help}')
+            lines.append(f'# TYPE {metric.name} {metric.type}')
+            for name, value in metric.samples():
+                lines.append(f'{name} {_format_value(value)}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = Registry()
+
+REQUESTS = registry.register(Counter(
+    'http_requests_total', 'HTTP requests by route, method and status.', labels=('route', 'method', 'status')
+))
+REQUEST_LATENCY = registry.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by route and method.', labels=('route', 'method')
+))
+ATTENDANCE_ROWS_WRITTEN = registry.register(Counter(
+    'attendance_rows_written_total', 'Attendance rows inserted.'
+))
+
+
+def process_rss_bytes():
+    """Current resident set size, or the peak on platforms without /proc"""
+    try:
+        with open('/proc/self/statm') as statm:
+            return int(statm.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def init_metrics(app, db, stats_cache=None):
+    """Record per-route request metrics and serve them at /metrics"""
+    from pool import pool_status
+
+    registry.register(CallbackMetric('process_resident_memory_bytes', 'Resident memory size in bytes.', process_rss_bytes))
+
+    if stats_cache is not None:
+        registry.register(CallbackMetric('stats_cache_hits_total', 'Course statistics cache hits.', lambda: stats_cache.hits, type='counter'))
+        registry.register(CallbackMetric('stats_cache_misses_total', 'Course statistics cache misses.', lambda: stats_cache.misses, type='counter'))
+
+    def pool_value(field):
+        def read():
+            with app.app_context():
+                return pool_status(db.engine).get(field)
+        return read
+
+    registry.register(CallbackMetric('db_pool_checked_out', 'Connections currently checked out.', pool_value('checked_out')))
+    registry.register(CallbackMetric('db_pool_idle', 'Idle connections in the pool.', pool_value('idle')))
+    registry.register(CallbackMetric('db_pool_overflow', 'Connections above the pool size.', pool_value('overflow')))
+    registry.register(CallbackMetric('db_pool_checkouts_total', 'Connection checkouts.', pool_value('checkouts'), type='counter'))
+    registry.register(CallbackMetric('db_pool_timeouts_total', 'Connection checkouts that timed out.', pool_value('timeouts'), type='counter'))
+
+    @app.before_request
+    def start_metrics_timer():
+        g.metrics_started = time.perf_counter()
+
+    @app.after_request
+    def record_request_metrics(response):
+        started = g.pop('metrics_started', None)
+        if started is None:
+            return response
+        # The URL rule keeps label cardinality bounded, unlike the raw path
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        REQUESTS.inc(route=route, method=request.method, status=response.status_code)
+        REQUEST_LATENCY.observe(time.perf_counter() - started, route=route, method=request.method)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        return Response(registry.render(), mimetype='text/plain; version=0.0.4')
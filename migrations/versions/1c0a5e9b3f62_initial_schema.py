@@ -0,0 +1,62 @@
+"""initial schema
+
+The tables the app used to create with db.create_all() on import. Databases
+stamped at 79679f96f5bf, the first revision before this one was added, are
+already past it. Tables that exist already are left alone, so a database
+that db.create_all() made but that was never stamped upgrades as well.
+
+Revision ID: 1c0a5e9b3f62
+Revises: 
+Create Date: 2025-05-10 18:02:11.093512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = '1c0a5e9b3f62'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    existing = set(sa.inspect(op.get_bind()).get_table_names())
+    if 'teacher' not in existing:
+        op.create_table('teacher',
+            sa.Column('course_code', sa.String(length=10), nullable=False),
+            sa.Column('Teacher', postgresql.ARRAY(sa.String(length=50)), nullable=False),
+            sa.Column('TA', postgresql.ARRAY(sa.String(length=50)), nullable=False),
+            sa.PrimaryKeyConstraint('course_code')
+        )
+    if 'student' not in existing:
+        op.create_table('student',
+            sa.Column('_id', sa.String(length=36), nullable=False),
+            sa.Column('course_code', sa.String(length=10), nullable=False),
+            sa.Column('roll_no', sa.String(length=12), nullable=False),
+            sa.Column('name', sa.String(length=70), nullable=False),
+            sa.ForeignKeyConstraint(['course_code'], ['teacher.course_code'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('_id'),
+            sa.UniqueConstraint('course_code', 'roll_no', name='uix_course_roll')
+        )
+    if 'attendance' not in existing:
+        op.create_table('attendance',
+            sa.Column('id', sa.String(length=36), nullable=False),
+            sa.Column('student_id', sa.String(length=36), nullable=False),
+            sa.Column('class_date', sa.DateTime(), nullable=False),
+            sa.ForeignKeyConstraint(['student_id'], ['student._id'], ondelete='CASCADE'),
+            sa.PrimaryKeyConstraint('id')
+        )
+        with op.batch_alter_table('attendance', schema=None) as batch_op:
+            batch_op.create_index('idx_attendance_student_date', ['student_id', 'class_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.drop_index('idx_attendance_student_date')
+
+    op.drop_table('attendance')
+    op.drop_table('student')
+    op.drop_table('teacher')
@@ -0,0 +1,27 @@
+"""add student enrolled_at
+
+Revision ID: 3b8e1f0c2d47
+Revises: 79679f96f5bf
+Create Date: 2025-05-18 14:02:11.508213
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e1f0c2d47'
+down_revision = '79679f96f5bf'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Existing students keep NULL, meaning they count towards every class of the course
+    with op.batch_alter_table('student', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('enrolled_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('student', schema=None) as batch_op:
+        batch_op.drop_column('enrolled_at')
@@ -0,0 +1,91 @@
+"""range partition attendance by month of class_date
+
+Revision ID: 4a9c2f7e1b08
+Revises: e3f81c6a2d57
+Create Date: 2025-09-15 16:40:27.561093
+
+"""
+from datetime import datetime, timezone
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4a9c2f7e1b08'
+down_revision = 'e3f81c6a2d57'
+branch_labels = None
+depends_on = None
+
+# Partitions created past the current month, later ones are created by the app
+MONTHS_AHEAD = 2
+
+
+def _add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def _attendance_columns():
+    return [
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('student_id', sa.String(length=36), nullable=False),
+        sa.Column('class_date', sa.DateTime(), nullable=False),
+        sa.Column('session_id', sa.String(length=36), nullable=False),
+    ]
+
+
+def _rename_attendance(new_name):
+    """Move the current attendance table and its index names out of the way"""
+    op.rename_table('attendance', new_name)
+    op.execute(f'ALTER INDEX attendance_pkey RENAME TO {new_name}_pkey')
+    op.execute(f'ALTER INDEX idx_attendance_student_date RENAME TO {new_name}_student_date')
+    op.execute(f'ALTER INDEX idx_attendance_session RENAME TO {new_name}_session')
+
+
+def _finish_attendance(old_name):
+    """Indexes and foreign keys of the new attendance table, built after the copy"""
+    op.execute(f'INSERT INTO attendance (id, student_id, class_date, session_id) '
+               f'SELECT id, student_id, class_date, session_id FROM {old_name}')
+    op.create_index('idx_attendance_student_date', 'attendance', ['student_id', 'class_date'], unique=False)
+    op.create_index('idx_attendance_session', 'attendance', ['session_id'], unique=False)
+    op.create_foreign_key('attendance_student_id_fkey', 'attendance', 'student', ['student_id'], ['_id'], ondelete='CASCADE')
+    op.create_foreign_key('attendance_session_id_fkey', 'attendance', 'class_session', ['session_id'], ['id'], ondelete='CASCADE')
+    op.drop_table(old_name)
+
+
+def upgrade():
+    _rename_attendance('attendance_unpartitioned')
+    op.create_table('attendance',
+        *_attendance_columns(),
+        sa.PrimaryKeyConstraint('id', 'class_date', name='attendance_pkey'),
+        postgresql_partition_by='RANGE (class_date)'
+    )
+
+    # One partition per month from the oldest row to a few months from now
+    first, last = op.get_bind().execute(sa.text(
+        'SELECT min(class_date), max(class_date) FROM attendance_unpartitioned'
+    )).one()
+    now = datetime.now(timezone.utc)
+    month = datetime((first or now).year, (first or now).month, 1)
+    end = max(_add_months(datetime(now.year, now.month, 1), MONTHS_AHEAD),
+              datetime(last.year, last.month, 1) if last else month)
+    while month <= end:
+        following = _add_months(month, 1)
+        op.execute(
+            f"CREATE TABLE attendance_y{month.year:04d}m{month.month:02d} PARTITION OF attendance "
+            f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{following:%Y-%m-%d}')"
+        )
+        month = following
+
+    _finish_attendance('attendance_unpartitioned')
+
+
+def downgrade():
+    # Drops the partitions with the partitioned table, archived ones are left alone
+    _rename_attendance('attendance_partitioned')
+    op.create_table('attendance',
+        *_attendance_columns(),
+        sa.PrimaryKeyConstraint('id', name='attendance_pkey')
+    )
+    _finish_attendance('attendance_partitioned')
@@ -0,0 +1,59 @@
+"""add attendance_summary counters
+
+Existing teacher.total_classes values are kept, only raised where a course
+has more class_session rows than its counter. Counters from before
+class_session existed may count classes that left no session behind, and
+recounting would make such courses report fewer classes. To recount every
+course from its sessions instead, the way `flask rebuild-attendance-summary`
+does, upgrade with `flask db upgrade -x recount_total_classes=true`.
+
+Revision ID: 5f0b7c3d8e21
+Revises: e58f3a6b1c92
+Create Date: 2025-05-27 11:20:54.603118
+
+"""
+from alembic import context, op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5f0b7c3d8e21'
+down_revision = 'e58f3a6b1c92'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attendance_summary',
+        sa.Column('student_id', sa.String(length=36), nullable=False),
+        sa.Column('course_code', sa.String(length=10), nullable=False),
+        sa.Column('attended_count', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('last_attended_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['course_code'], ['teacher.course_code'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['student_id'], ['student._id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id')
+    )
+    with op.batch_alter_table('attendance_summary', schema=None) as batch_op:
+        batch_op.create_index('idx_attendance_summary_course', ['course_code'], unique=False)
+
+    # Backfill the counters, same as `flask rebuild-attendance-summary`
+    op.execute("""
+        INSERT INTO attendance_summary (student_id, course_code, attended_count, last_attended_at)
+        SELECT a.student_id, s.course_code, count(a.id), max(a.class_date)
+        FROM attendance a
+        JOIN student s ON s._id = a.student_id
+        GROUP BY a.student_id, s.course_code
+    """)
+    session_count = "(SELECT count(*) FROM class_session cs WHERE cs.course_code = teacher.course_code)"
+    recount = context.get_x_argument(as_dictionary=True).get('recount_total_classes', '').lower() in ('1', 'true', 'yes', 'on')
+    if recount:
+        op.execute(f"UPDATE teacher SET total_classes = {session_count}")
+    else:
+        op.execute(f"UPDATE teacher SET total_classes = greatest(total_classes, {session_count})")
+
+
+def downgrade():
+    with op.batch_alter_table('attendance_summary', schema=None) as batch_op:
+        batch_op.drop_index('idx_attendance_summary_course')
+
+    op.drop_table('attendance_summary')
@@ -1,7 +1,7 @@
 """empty message
 
 Revision ID: 79679f96f5bf
-Revises: 
+Revises: 1c0a5e9b3f62
 Create Date: 2025-05-11 00:21:30.674364
 
 """
@@ -11,12 +11,16 @@ import sqlalchemy as sa
 
 # revision identifiers, used by Alembic.
 revision = '79679f96f5bf'
-down_revision = None
+down_revision = '1c0a5e9b3f62'
 branch_labels = None
 depends_on = None
 
 
 def upgrade():
+    # db.create_all() made the column along with the table, see 1c0a5e9b3f62
+    columns = {column['name'] for column in sa.inspect(op.get_bind()).get_columns('teacher')}
+    if 'total_classes' in columns:
+        return
     # ### commands auto generated by Alembic - please adjust! ###
     with op.batch_alter_table('teacher', schema=None) as batch_op:
         batch_op.add_column(sa.Column('total_classes', sa.Integer(), nullable=True))
@@ -0,0 +1,69 @@
+"""add daily attendance rollups
+
+Revision ID: 9d4a2b6e7f38
+Revises: 5f0b7c3d8e21
+Create Date: 2025-06-02 15:41:07.274930
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d4a2b6e7f38'
+down_revision = '5f0b7c3d8e21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('course_daily_rollup',
+        sa.Column('course_code', sa.String(length=10), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('sessions', sa.Integer(), server_default='0', nullable=False),
+        sa.Column('attendance', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['course_code'], ['teacher.course_code'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('course_code', 'day')
+    )
+    op.create_table('student_daily_rollup',
+        sa.Column('student_id', sa.String(length=36), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('course_code', sa.String(length=10), nullable=False),
+        sa.Column('attended', sa.Integer(), server_default='0', nullable=False),
+        sa.ForeignKeyConstraint(['course_code'], ['teacher.course_code'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['student_id'], ['student._id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('student_id', 'day')
+    )
+    with op.batch_alter_table('student_daily_rollup', schema=None) as batch_op:
+        batch_op.create_index('idx_student_daily_rollup_course_day', ['course_code', 'day'], unique=False)
+
+    # Backfill, same as `flask rebuild-daily-rollup`
+    op.execute("""
+        INSERT INTO course_daily_rollup (course_code, day, sessions)
+        SELECT course_code, started_at::date, count(*)
+        FROM class_session
+        GROUP BY course_code, started_at::date
+    """)
+    op.execute("""
+        INSERT INTO course_daily_rollup (course_code, day, attendance)
+        SELECT s.course_code, a.class_date::date, count(*)
+        FROM attendance a
+        JOIN student s ON s._id = a.student_id
+        GROUP BY s.course_code, a.class_date::date
+        ON CONFLICT (course_code, day) DO UPDATE SET attendance = EXCLUDED.attendance
+    """)
+    op.execute("""
+        INSERT INTO student_daily_rollup (student_id, day, course_code, attended)
+        SELECT a.student_id, a.class_date::date, s.course_code, count(*)
+        FROM attendance a
+        JOIN student s ON s._id = a.student_id
+        GROUP BY a.student_id, a.class_date::date, s.course_code
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('student_daily_rollup', schema=None) as batch_op:
+        batch_op.drop_index('idx_student_daily_rollup_course_day')
+
+    op.drop_table('student_daily_rollup')
+    op.drop_table('course_daily_rollup')
@@ -0,0 +1,61 @@
+"""add class_session and backfill from attendance
+
+Revision ID: a41c9d27e6b3
+Revises: 3b8e1f0c2d47
+Create Date: 2025-05-20 10:37:45.190822
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a41c9d27e6b3'
+down_revision = '3b8e1f0c2d47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('class_session',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('course_code', sa.String(length=10), nullable=False),
+        sa.Column('started_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['course_code'], ['teacher.course_code'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('course_code', 'started_at', name='uix_course_session')
+    )
+
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('session_id', sa.String(length=36), nullable=True))
+
+    # Every distinct (course, class_date) seen in attendance becomes a session
+    op.execute("""
+        INSERT INTO class_session (id, course_code, started_at)
+        SELECT gen_random_uuid()::text, s.course_code, a.class_date
+        FROM attendance a
+        JOIN student s ON s._id = a.student_id
+        GROUP BY s.course_code, a.class_date
+    """)
+    op.execute("""
+        UPDATE attendance a
+        SET session_id = cs.id
+        FROM student s, class_session cs
+        WHERE s._id = a.student_id
+          AND cs.course_code = s.course_code
+          AND cs.started_at = a.class_date
+    """)
+
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.alter_column('session_id', existing_type=sa.String(length=36), nullable=False)
+        batch_op.create_foreign_key('attendance_session_id_fkey', 'class_session', ['session_id'], ['id'], ondelete='CASCADE')
+        batch_op.create_index('idx_attendance_session', ['session_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('attendance', schema=None) as batch_op:
+        batch_op.drop_index('idx_attendance_session')
+        batch_op.drop_constraint('attendance_session_id_fkey', type_='foreignkey')
+        batch_op.drop_column('session_id')
+
+    op.drop_table('class_session')
@@ -0,0 +1,46 @@
+"""add attendance ticket queue
+
+Revision ID: b6e1d8f4a250
+Revises: 9d4a2b6e7f38
+Create Date: 2025-06-05 10:12:44.518301
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e1d8f4a250'
+down_revision = '9d4a2b6e7f38'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('attendance_ticket',
+        sa.Column('id', sa.String(length=36), nullable=False),
+        sa.Column('course_code', sa.String(length=10), nullable=False),
+        sa.Column('roll_numbers', postgresql.ARRAY(sa.String()), nullable=False),
+        sa.Column('idempotency_key', sa.String(length=100), nullable=True),
+        sa.Column('status', sa.String(length=10), server_default='pending', nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('applied_at', sa.DateTime(), nullable=True),
+        sa.Column('session_id', sa.String(length=36), nullable=True),
+        sa.Column('marked', sa.Integer(), nullable=True),
+        sa.Column('unknown_roll_numbers', postgresql.ARRAY(sa.String()), nullable=True),
+        sa.Column('error', sa.Text(), nullable=True),
+        sa.ForeignKeyConstraint(['course_code'], ['teacher.course_code'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['session_id'], ['class_session.id'], ondelete='SET NULL'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('course_code', 'idempotency_key', name='uix_ticket_idempotency')
+    )
+    with op.batch_alter_table('attendance_ticket', schema=None) as batch_op:
+        batch_op.create_index('idx_attendance_ticket_pending', ['created_at'], unique=False, postgresql_where=sa.text("status = 'pending'"))
+
+
+def downgrade():
+    with op.batch_alter_table('attendance_ticket', schema=None) as batch_op:
+        batch_op.drop_index('idx_attendance_ticket_pending', postgresql_where=sa.text("status = 'pending'"))
+
+    op.drop_table('attendance_ticket')
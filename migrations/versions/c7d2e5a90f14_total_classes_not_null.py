@@ -0,0 +1,35 @@
+"""make teacher.total_classes non-null with a server default
+
+Revision ID: c7d2e5a90f14
+Revises: a41c9d27e6b3
+Create Date: 2025-05-22 09:15:03.842716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7d2e5a90f14'
+down_revision = 'a41c9d27e6b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # total_classes + 1 stays NULL on NULL rows, so give existing courses a value first
+    op.execute("UPDATE teacher SET total_classes = 0 WHERE total_classes IS NULL")
+
+    with op.batch_alter_table('teacher', schema=None) as batch_op:
+        batch_op.alter_column('total_classes',
+               existing_type=sa.Integer(),
+               nullable=False,
+               server_default='0')
+
+
+def downgrade():
+    with op.batch_alter_table('teacher', schema=None) as batch_op:
+        batch_op.alter_column('total_classes',
+               existing_type=sa.Integer(),
+               nullable=True,
+               server_default=None)
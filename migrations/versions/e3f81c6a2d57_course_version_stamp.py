@@ -0,0 +1,29 @@
+"""add teacher.version and teacher.modified_at for conditional GETs
+
+Revision ID: e3f81c6a2d57
+Revises: b6e1d8f4a250
+Create Date: 2025-09-01 10:12:44.318209
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e3f81c6a2d57'
+down_revision = 'b6e1d8f4a250'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('teacher', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('version', sa.BigInteger(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('modified_at', sa.DateTime(), nullable=False,
+                                      server_default=sa.text("(now() at time zone 'utc')")))
+
+
+def downgrade():
+    with op.batch_alter_table('teacher', schema=None) as batch_op:
+        batch_op.drop_column('modified_at')
+        batch_op.drop_column('version')
@@ -0,0 +1,27 @@
+"""add GIN indexes on teacher staff arrays
+
+Revision ID: e58f3a6b1c92
+Revises: c7d2e5a90f14
+Create Date: 2025-05-24 16:48:29.317054
+
+"""
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision = 'e58f3a6b1c92'
+down_revision = 'c7d2e5a90f14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('teacher', schema=None) as batch_op:
+        batch_op.create_index('idx_teacher_teacher_gin', ['Teacher'], unique=False, postgresql_using='gin')
+        batch_op.create_index('idx_teacher_ta_gin', ['TA'], unique=False, postgresql_using='gin')
+
+
+def downgrade():
+    with op.batch_alter_table('teacher', schema=None) as batch_op:
+        batch_op.drop_index('idx_teacher_ta_gin', postgresql_using='gin')
+        batch_op.drop_index('idx_teacher_teacher_gin', postgresql_using='gin')
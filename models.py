@@ -1,6 +1,8 @@
 
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, update
 from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.orm.attributes import set_committed_value
 import uuid
 from datetime import datetime, timezone
 
@@ -12,10 +14,23 @@ class Teacher(db.Model):
     course_code = db.Column(db.String(10), primary_key=True)
     Teacher = db.Column(ARRAY(db.String(50)), nullable=False)
     TA = db.Column(ARRAY(db.String(50)), nullable=False)
-    total_classes = db.Column(db.Integer, default=0)
+    total_classes = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Bumped by every write that changes what the course's GET endpoints return,
+    # the ETag and Last-Modified of those responses are derived from it
+    version = db.Column(db.BigInteger, nullable=False, default=0, server_default='0')
+    modified_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc),
+                            server_default=db.text("(now() at time zone 'utc')"))
 
     # Relationship with students
     students = db.relationship('Student', backref='course', lazy=True, cascade='all, delete-orphan')
+    # Relationship with class sessions
+    sessions = db.relationship('ClassSession', backref='course', lazy=True, cascade='all, delete-orphan')
+
+    # GIN indexes so membership lookups (@>) on the staff arrays avoid a sequential scan
+    __table_args__ = (
+        db.Index('idx_teacher_teacher_gin', 'Teacher', postgresql_using='gin'),
+        db.Index('idx_teacher_ta_gin', 'TA', postgresql_using='gin'),
+    )
 
     def __init__(self, course_code, Teacher, TA):
         self.course_code = course_code
@@ -24,8 +39,40 @@ class Teacher(db.Model):
         self.total_classes = 0
 
     def increment_total_classes(self):
-        self.total_classes += 1
-        db.session.commit()
+        """Atomically increment total_classes as part of the current transaction"""
+        total_classes = Teacher.increment_total_classes_for_course(self.course_code)
+        set_committed_value(self, 'total_classes', total_classes)
+        return total_classes
+
+    @staticmethod
+    def version_bump():
+        """UPDATE values advancing a course's version stamp"""
+        return {'version': Teacher.version + 1, 'modified_at': func.timezone('utc', func.now())}
+
+    @staticmethod
+    def bump_version(course_code=None):
+        """Advance the version stamp of one course, or of all of them, as part
+        of the current transaction"""
+        statement = update(Teacher).values(**Teacher.version_bump())
+        if course_code is not None:
+            statement = statement.where(Teacher.course_code == course_code)
+        db.session.execute(statement.execution_options(synchronize_session=False))
+
+    @staticmethod
+    def increment_total_classes_for_course(course_code, amount=1, with_version=False):
+        """Increment total_classes server-side and return the new value, or None
+        if the course does not exist. The row stays locked until the caller commits,
+        so concurrent increments are serialized instead of lost. The version stamp
+        advances in the same statement, with_version returns a (total_classes,
+        version) row instead."""
+        result = db.session.execute(
+            update(Teacher)
+            .where(Teacher.course_code == course_code)
+            .values(total_classes=Teacher.total_classes + amount, **Teacher.version_bump())
+            .returning(Teacher.total_classes, Teacher.version)
+            .execution_options(synchronize_session=False)
+        )
+        return result.first() if with_version else result.scalar()
 
     def json(self):
         return {
@@ -42,6 +89,8 @@ class Student(db.Model):
     course_code = db.Column(db.String(10), db.ForeignKey('teacher.course_code', ondelete='CASCADE'), nullable=False)
     roll_no = db.Column(db.String(12), nullable=False)
     name = db.Column(db.String(70), nullable=False)
+    # NULL for students enrolled before this column existed, i.e. enrolled from the first class
+    enrolled_at = db.Column(db.DateTime, nullable=True, default=lambda: datetime.now(timezone.utc))
 
     # Relationship with attendance
     attendance_records = db.relationship('Attendance', backref='student', lazy=True, cascade='all, delete-orphan')
@@ -64,20 +113,52 @@ class Student(db.Model):
             'name': self.name
         }
 
+class ClassSession(db.Model):
+    __tablename__ = 'class_session'
+
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    course_code = db.Column(db.String(10), db.ForeignKey('teacher.course_code', ondelete='CASCADE'), nullable=False)
+    started_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+
+    # Relationship with attendance
+    attendance_records = db.relationship('Attendance', backref='class_session', lazy=True, cascade='all, delete-orphan')
+
+    # One session per course and start time, also serves course/date range lookups
+    __table_args__ = (
+        db.UniqueConstraint('course_code', 'started_at', name='uix_course_session'),
+    )
+
+    def __init__(self, course_code, started_at=None):
+        self.course_code = course_code
+        self.started_at = started_at or datetime.now(timezone.utc)
+
+    def json(self):
+        return {
+            'id': self.id,
+            'course_code': self.course_code,
+            'started_at': self.started_at.isoformat() if self.started_at else None
+        }
+
 class Attendance(db.Model):
     __tablename__ = 'attendance'
     
     id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     student_id = db.Column(db.String(36), db.ForeignKey('student._id', ondelete='CASCADE'), nullable=False)
-    class_date = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    session_id = db.Column(db.String(36), db.ForeignKey('class_session.id', ondelete='CASCADE'), nullable=False)
+    # Partition key, so it is part of the primary key
+    class_date = db.Column(db.DateTime, primary_key=True, nullable=False, default=lambda: datetime.now(timezone.utc))
 
-    # Add index for faster queries
+    # Range partitioned by month of class_date, see partitions.py. Queries
+    # bounded on class_date only scan the partitions of the months they cover.
     __table_args__ = (
         db.Index('idx_attendance_student_date', 'student_id', 'class_date'),
+        db.Index('idx_attendance_session', 'session_id'),
+        {'postgresql_partition_by': 'RANGE (class_date)'},
     )
 
-    def __init__(self, student_id, class_date=None):
+    def __init__(self, student_id, session_id, class_date=None):
         self.student_id = student_id
+        self.session_id = session_id
         self.class_date = class_date or datetime.now(timezone.utc)
 
     def json(self):
@@ -87,4 +168,121 @@ class Attendance(db.Model):
             'class_date': self.class_date.isoformat() if self.class_date else None
         }
 
-        
+class AttendanceSummary(db.Model):
+    __tablename__ = 'attendance_summary'
+
+    # Maintained by mark_attendance, rebuilt from attendance with `flask rebuild-attendance-summary`
+    student_id = db.Column(db.String(36), db.ForeignKey('student._id', ondelete='CASCADE'), primary_key=True)
+    course_code = db.Column(db.String(10), db.ForeignKey('teacher.course_code', ondelete='CASCADE'), nullable=False)
+    attended_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    last_attended_at = db.Column(db.DateTime, nullable=True)
+
+    __table_args__ = (
+        db.Index('idx_attendance_summary_course', 'course_code'),
+    )
+
+    def __init__(self, student_id, course_code, attended_count=0, last_attended_at=None):
+        self.student_id = student_id
+        self.course_code = course_code
+        self.attended_count = attended_count
+        self.last_attended_at = last_attended_at
+
+    def json(self):
+        return {
+            'student_id': self.student_id,
+            'course_code': self.course_code,
+            'attended_count': self.attended_count,
+            'last_attended_at': self.last_attended_at.isoformat() if self.last_attended_at else None
+        }
+
+class CourseDailyRollup(db.Model):
+    __tablename__ = 'course_daily_rollup'
+
+    # Per course and UTC day: sessions held and attendance rows written
+    course_code = db.Column(db.String(10), db.ForeignKey('teacher.course_code', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    sessions = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    attendance = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    def __init__(self, course_code, day, sessions=0, attendance=0):
+        self.course_code = course_code
+        self.day = day
+        self.sessions = sessions
+        self.attendance = attendance
+
+    def json(self):
+        return {
+            'course_code': self.course_code,
+            'day': self.day.isoformat() if self.day else None,
+            'sessions': self.sessions,
+            'attendance': self.attendance
+        }
+
+class StudentDailyRollup(db.Model):
+    __tablename__ = 'student_daily_rollup'
+
+    # Per student and UTC day: classes attended
+    student_id = db.Column(db.String(36), db.ForeignKey('student._id', ondelete='CASCADE'), primary_key=True)
+    day = db.Column(db.Date, primary_key=True)
+    course_code = db.Column(db.String(10), db.ForeignKey('teacher.course_code', ondelete='CASCADE'), nullable=False)
+    attended = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+
+    __table_args__ = (
+        db.Index('idx_student_daily_rollup_course_day', 'course_code', 'day'),
+    )
+
+    def __init__(self, student_id, day, course_code, attended=0):
+        self.student_id = student_id
+        self.day = day
+        self.course_code = course_code
+        self.attended = attended
+
+    def json(self):
+        return {
+            'student_id': self.student_id,
+            'day': self.day.isoformat() if self.day else None,
+            'course_code': self.course_code,
+            'attended': self.attended
+        }
+
+class AttendanceTicket(db.Model):
+    __tablename__ = 'attendance_ticket'
+
+    # Durable queue of attendance batches accepted by POST /attendance in async mode
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    course_code = db.Column(db.String(10), db.ForeignKey('teacher.course_code', ondelete='CASCADE'), nullable=False)
+    roll_numbers = db.Column(ARRAY(db.String), nullable=False)
+    idempotency_key = db.Column(db.String(100), nullable=True)
+    status = db.Column(db.String(10), nullable=False, default='pending', server_default='pending')
+    created_at = db.Column(db.DateTime, nullable=False, default=lambda: datetime.now(timezone.utc))
+    applied_at = db.Column(db.DateTime, nullable=True)
+    session_id = db.Column(db.String(36), db.ForeignKey('class_session.id', ondelete='SET NULL'), nullable=True)
+    marked = db.Column(db.Integer, nullable=True)
+    unknown_roll_numbers = db.Column(ARRAY(db.String), nullable=True)
+    error = db.Column(db.Text, nullable=True)
+
+    # A retried request with the same key maps to the same ticket, and the worker
+    # only ever scans the pending tail of the queue
+    __table_args__ = (
+        db.UniqueConstraint('course_code', 'idempotency_key', name='uix_ticket_idempotency'),
+        db.Index('idx_attendance_ticket_pending', 'created_at', postgresql_where=db.text("status = 'pending'")),
+    )
+
+    def __init__(self, course_code, roll_numbers, idempotency_key=None):
+        self.course_code = course_code
+        self.roll_numbers = roll_numbers
+        self.idempotency_key = idempotency_key
+
+    def json(self):
+        return {
+            'ticket_id': self.id,
+            'course_code': self.course_code,
+            'status': self.status,
+            'idempotency_key': self.idempotency_key,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'applied_at': self.applied_at.isoformat() if self.applied_at else None,
+            'session_id': self.session_id,
+            'marked': self.marked,
+            'unknown_roll_numbers': self.unknown_roll_numbers,
+            'error': self.error
+        }
@@ -0,0 +1,170 @@
+import os
+import re
+import logging
+import threading
+from datetime import datetime, timezone
+
+from sqlalchemy import text
+
+logger = logging.getLogger('teacher.partitions')
+
+# attendance is range partitioned by class_date, one partition per UTC month
+ARCHIVE_SCHEMA = 'attendance_archive'
+_PARTITION_NAME = re.compile(r'^attendance_y(\d{4})m(\d{2})$')
+# Serializes partition DDL across processes
+_ADVISORY_LOCK_KEY = 0x61747464
+
+
+def month_start(value):
+    """First instant of the UTC month of a datetime, naive like class_date"""
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    return datetime(value.year, value.month, 1)
+
+
+def add_months(month, count):
+    index = month.year * 12 + month.month - 1 + count
+    return datetime(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f'attendance_y{month.year:04d}m{month.month:02d}'
+
+
+def partition_month(name):
+    """The month of a partition name, None for other tables"""
+    match = _PARTITION_NAME.match(name)
+    return datetime(int(match.group(1)), int(match.group(2)), 1) if match else None
+
+
+def attached_partitions(connection):
+    """Months of the partitions attached to attendance, oldest first"""
+    names = connection.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = 'attendance'::regclass"
+    )).scalars()
+    return sorted(month for month in map(partition_month, names) if month is not None)
+
+
+def archive_boundary(connection):
+    """First month still attached to attendance, None when there is none.
+    Months before it were archived or never had rows, their attendance only
+    lives on in the rollups and summary counters."""
+    months = attached_partitions(connection)
+    return months[0] if months else None
+
+
+def create_partition(connection, month):
+    """Create the partition of a month as a plain table, then attach it.
+
+    Attaching takes a SHARE UPDATE EXCLUSIVE lock on attendance, so reads and
+    inserts carry on meanwhile, where CREATE TABLE ... PARTITION OF would take
+    an ACCESS EXCLUSIVE one. The indexes and foreign keys of attendance are
+    cloned onto the partition while it is still empty.
+    """
+    name = partition_name(month)
+    connection.execute(text(f'CREATE TABLE IF NOT EXISTS {name} (LIKE attendance INCLUDING DEFAULTS)'))
+    connection.execute(text(
+        f"ALTER TABLE attendance ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ('{month:%Y-%m-%d}') TO ('{add_months(month, 1):%Y-%m-%d}')"
+    ))
+
+
+class AttendancePartitions:
+    """Creates the monthly partitions of attendance before rows are written to them.
+
+    Months known to have a partition are remembered per process, so on the
+    write path the check is a set lookup and the catalog is only read for an
+    unknown month. Missing partitions, and those of the next months_ahead
+    months, are created on a separate connection and committed before the
+    write starts; callers must not have written to attendance, student or
+    class_session in their own transaction yet, as attaching waits for them.
+    """
+
+    def __init__(self):
+        self.months_ahead = 2
+        self.lock_timeout_ms = 5000
+        self.created = 0
+        self._known = set()
+        self._lock = threading.Lock()
+
+    def configure(self, months_ahead=2, lock_timeout_ms=5000):
+        self.months_ahead = months_ahead
+        self.lock_timeout_ms = lock_timeout_ms
+        with self._lock:
+            self._known.clear()
+
+    def known(self, values):
+        """Whether the months of every given datetime are known to have a partition"""
+        needed = {month_start(value) for value in values}
+        with self._lock:
+            return needed <= self._known
+
+    def ensure(self, engine, values):
+        """Make sure the month of every given datetime has a partition"""
+        needed = {month_start(value) for value in values}
+        with self._lock:
+            if needed <= self._known:
+                return
+        current = month_start(datetime.now(timezone.utc))
+        wanted = needed | {add_months(current, count) for count in range(self.months_ahead + 1)}
+
+        created = []
+        with engine.begin() as connection:
+            # Give up rather than queue every attendance query behind a long wait
+            connection.execute(text(f'SET LOCAL lock_timeout = {int(self.lock_timeout_ms)}'))
+            connection.execute(text('SELECT pg_advisory_xact_lock(:key)'), {'key': _ADVISORY_LOCK_KEY})
+            existing = set(attached_partitions(connection))
+            for month in sorted(wanted - existing):
+                create_partition(connection, month)
+                created.append(month)
+
+        with self._lock:
+            self._known |= existing | wanted
+            self.created += len(created)
+        if created:
+            logger.info('Created attendance partitions %s', ', '.join(map(partition_name, created)))
+
+    def stats(self):
+        with self._lock:
+            return {'known_months': len(self._known), 'created': self.created, 'months_ahead': self.months_ahead}
+
+
+def archive_partitions(engine, before, drop=False):
+    """Detach the partitions of every month before the month of `before` and
+    move them to the attendance_archive schema, or drop them. Returns their names.
+
+    The rollups and summary counters keep the archived months, and the
+    rebuilds leave them alone, see archive_boundary. Exports and partial-day
+    range edges read raw rows, so they no longer see them.
+    """
+    before = month_start(before)
+    if before > month_start(datetime.now(timezone.utc)):
+        raise ValueError('Only months before the current one can be archived')
+
+    with engine.connect() as connection:
+        months = [month for month in attached_partitions(connection) if month < before]
+
+    archived = []
+    # DETACH ... CONCURRENTLY keeps attendance readable and writable, it cannot
+    # run inside a transaction block
+    with engine.execution_options(isolation_level='AUTOCOMMIT').connect() as connection:
+        if months and not drop:
+            connection.execute(text(f'CREATE SCHEMA IF NOT EXISTS {ARCHIVE_SCHEMA}'))
+        for month in months:
+            name = partition_name(month)
+            connection.execute(text(f'ALTER TABLE attendance DETACH PARTITION {name} CONCURRENTLY'))
+            if drop:
+                connection.execute(text(f'DROP TABLE {name}'))
+            else:
+                connection.execute(text(f'ALTER TABLE {name} SET SCHEMA {ARCHIVE_SCHEMA}'))
+            archived.append(name)
+    return archived
+
+
+def partition_options_from_env():
+    """AttendancePartitions.configure arguments from ATTENDANCE_PARTITION_* environment variables"""
+    return {
+        'months_ahead': int(os.environ.get('ATTENDANCE_PARTITION_MONTHS_AHEAD', 2)),
+        'lock_timeout_ms': int(os.environ.get('ATTENDANCE_PARTITION_LOCK_TIMEOUT_MS', 5000)),
+    }
@@ -0,0 +1,123 @@
+import os
+import time
+import logging
+import threading
+
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from settings import env_flag
+
+logger = logging.getLogger('teacher.pool')
+
+_request_wait = threading.local()
+
+
+class PoolWaitStats:
+    """Cumulative checkout wait of one pool"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+    def record(self, waited, timed_out=False):
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+    def as_dict(self):
+        with self._lock:
+            return {
+                'checkouts': self.checkouts,
+                'timeouts': self.timeouts,
+                'avg_wait_ms': round(self.total_wait / self.checkouts * 1000, 3) if self.checkouts else 0.0,
+                'max_wait_ms': round(self.max_wait * 1000, 3),
+            }
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long callers wait for a connection.
+
+    SQLAlchemy has no event before a checkout starts, so the wait is timed
+    around the public connect(), which includes opening a new connection and
+    the pre-ping. The stats live on the pool and move to its replacement when
+    the engine is disposed.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.wait_stats = PoolWaitStats()
+
+    def connect(self):
+        started = time.perf_counter()
+        timed_out = False
+        try:
+            return super().connect()
+        except PoolTimeoutError:
+            timed_out = True
+            raise
+        finally:
+            waited = time.perf_counter() - started
+            _request_wait.seconds = getattr(_request_wait, 'seconds', 0.0) + waited
+            self.wait_stats.record(waited, timed_out)
+
+    def recreate(self):
+        pool = super().recreate()
+        pool.wait_stats = self.wait_stats
+        return pool
+
+
+def engine_options_from_env():
+    """SQLALCHEMY_ENGINE_OPTIONS built from DB_* environment variables"""
+    options = {
+        'poolclass': TimedQueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        'pool_recycle': int(os.environ.get('DB_POOL_RECYCLE', 1800)),
+        'pool_pre_ping': env_flag('DB_POOL_PRE_PING', True),
+    }
+    statement_timeout = os.environ.get('DB_STATEMENT_TIMEOUT_MS')
+    if statement_timeout:
+        options['connect_args'] = {'options': f"-c statement_timeout={int(statement_timeout)}"}
+    return options
+
+
+def pool_status(engine):
+    """Current pool occupancy plus cumulative checkout wait statistics"""
+    pool = engine.pool
+    status = {
+        'pool_class': type(pool).__name__,
+        'size': pool.size() if hasattr(pool, 'size') else None,
+        'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+        'idle': pool.checkedin() if hasattr(pool, 'checkedin') else None,
+        'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+    }
+    if isinstance(pool, TimedQueuePool):
+        status.update(pool.wait_stats.as_dict())
+    return status
+
+
+def init_pool_metrics(app, db):
+    """Log pool occupancy and this request's connection wait when DB_POOL_LOG is set"""
+    if not env_flag('DB_POOL_LOG', False):
+        return
+
+    @app.before_request
+    def reset_pool_wait():
+        _request_wait.seconds = 0.0
+
+    @app.after_request
+    def log_pool_wait(response):
+        status = pool_status(db.engine)
+        logger.info(
+            "pool checked_out=%s idle=%s overflow=%s wait_ms=%.3f",
+            status['checked_out'], status['idle'], status['overflow'],
+            getattr(_request_wait, 'seconds', 0.0) * 1000
+        )
+        return response
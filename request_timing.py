@@ -0,0 +1,114 @@
+import os
+import json
+import time
+import logging
+import threading
+
+from flask import request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from settings import env_flag
+
+logger = logging.getLogger('teacher.requests')
+
+_current = threading.local()
+
+
+class RequestTiming:
+    """SQL statement count and timings collected for the current request"""
+
+    __slots__ = ('started', 'statements', 'db_time', 'slowest_time', 'slowest_statement')
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.statements = 0
+        self.db_time = 0.0
+        self.slowest_time = 0.0
+        self.slowest_statement = None
+
+
+def current_timing():
+    """The RequestTiming of the request running on this thread, if any"""
+    return getattr(_current, 'timing', None)
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('query_started', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info['query_started'].pop()
+    timing = current_timing()
+    if timing is None:
+        return
+    elapsed = time.perf_counter() - started
+    timing.statements += 1
+    timing.db_time += elapsed
+    if elapsed > timing.slowest_time:
+        timing.slowest_time = elapsed
+        timing.slowest_statement = statement
+
+
+def _handle_error(exception_context):
+    # A failed statement never reaches after_cursor_execute, drop its start time
+    connection = exception_context.connection
+    if connection is not None and connection.info.get('query_started'):
+        connection.info['query_started'].pop()
+
+
+def init_request_timing(app):
+    """Record per-request SQL counts and latency, report them in a Server-Timing
+    header and a structured log line.
+
+    REQUEST_TIMING=0 turns it off. SLOW_REQUEST_MS logs requests slower than the
+    threshold at WARNING level together with their slowest statement.
+    """
+    if not env_flag('REQUEST_TIMING', True):
+        return
+    slow_request_ms = os.environ.get('SLOW_REQUEST_MS')
+    slow_request_ms = float(slow_request_ms) if slow_request_ms else None
+
+    # The listeners are global, register them once however many apps are created
+    if not event.contains(Engine, 'before_cursor_execute', _before_cursor_execute):
+        event.listen(Engine, 'before_cursor_execute', _before_cursor_execute)
+        event.listen(Engine, 'after_cursor_execute', _after_cursor_execute)
+        event.listen(Engine, 'handle_error', _handle_error)
+
+    @app.before_request
+    def start_request_timing():
+        _current.timing = RequestTiming()
+
+    @app.after_request
+    def finish_request_timing(response):
+        timing = current_timing()
+        if timing is None:
+            return response
+        total_ms = (time.perf_counter() - timing.started) * 1000
+        db_ms = timing.db_time * 1000
+
+        response.headers.add(
+            'Server-Timing',
+            f'db;dur={db_ms:.2f};desc="{timing.statements} queries", app;dur={total_ms:.2f}'
+        )
+
+        record = {
+            'method': request.method,
+            'path': request.path,
+            'endpoint': request.endpoint,
+            'status': response.status_code,
+            'duration_ms': round(total_ms, 2),
+            'db_ms': round(db_ms, 2),
+            'db_statements': timing.statements,
+            'slowest_statement_ms': round(timing.slowest_time * 1000, 2),
+        }
+        if slow_request_ms is not None and total_ms >= slow_request_ms:
+            record['slowest_statement'] = timing.slowest_statement
+            logger.warning(json.dumps(record))
+        else:
+            logger.info(json.dumps(record))
+        return response
+
+    @app.teardown_request
+    def clear_request_timing(exc):
+        _current.timing = None
@@ -1,15 +1,66 @@
-from flask import Blueprint, request, jsonify
-from services import *
-from sqlalchemy import func
-from models import *
+from flask import Blueprint, request, jsonify, Response, stream_with_context, url_for, current_app
+import os
+import json
+from datetime import datetime
+from services import (
+    stats_cache, attendance_index, LOW_ATTENDANCE_DENOMINATORS, LOW_ATTENDANCE_ORDER,
+    get_teacher_courses, add_student_to_course, import_students_to_course,
+    get_course_students, iter_course_students, get_course_sessions, iter_attendance_matrix,
+    mark_attendance, enqueue_attendance, get_attendance_ticket,
+    get_student_attendance_stats, get_course_attendance_stats, get_courses_attendance_stats,
+    iter_courses_attendance_stats, get_low_attendance_students, get_students_attendance_percentage,
+    add_ta_to_course, remove_ta_from_course,
+    get_course_versions, get_teacher_course_versions, get_student_course_version
+)
+from models import db, Teacher
+from conditional import conditional, conditional_response
+from pool import pool_status
+from ingest import wake_ingest_worker
+from export import EXPORT_FORMATS, format_available, export_attendance_matrix
 
 # Create a Blueprint
 teacher_bp = Blueprint('teacher', __name__)
 
+MAX_STUDENTS_PAGE_SIZE = 1000
+MAX_BATCH_COURSES = 200
+EXPORT_CHUNK_SIZE = 500
+MAX_LOW_ATTENDANCE_PAGE_SIZE = 1000
+STATS_BATCH_WORKERS = int(os.environ.get('STATS_BATCH_WORKERS', 4))
+
+# Version stamps behind the conditional GETs, None lets the view answer on its own
+def _course_versions(course_code):
+    return get_course_versions([course_code]) or None
+
+def _student_versions(student_id):
+    return get_student_course_version(student_id) or None
+
+def _batch_versions():
+    course_codes = {code for code in request.args.get('course_codes', '').split(',') if code}
+    email = request.args.get('email')
+    if len(course_codes) > MAX_BATCH_COURSES:
+        return None
+    # Requested courses that do not exist are part of the response too
+    versions = dict.fromkeys(course_codes)
+    if course_codes:
+        versions.update(get_course_versions(course_codes))
+    if email:
+        versions.update(get_teacher_course_versions(email))
+    return versions or None
+
 @teacher_bp.route('/test', methods=['GET'])
 def test():
     return jsonify({'message': 'Server is running'})
 
+@teacher_bp.route('/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss counters of the course statistics cache and the attendance index"""
+    return jsonify(dict(stats_cache.stats(), attendance_index=attendance_index.stats())), 200
+
+@teacher_bp.route('/pool/stats', methods=['GET'])
+def pool_stats():
+    """Connection pool occupancy and checkout wait times"""
+    return jsonify(pool_status(db.engine)), 200
+
 @teacher_bp.route('/courses', methods=['GET'])
 def get_courses():
     """Get all courses for a teacher/TA"""
@@ -18,8 +69,9 @@ def get_courses():
         return jsonify({'error': 'Email is required'}), 400
     
     try:
-        courses = get_teacher_courses(email)
-        return jsonify(courses), 200
+        # The course rows carry their version stamps, no separate lookup
+        courses, versions = get_teacher_courses(email, with_versions=True)
+        return conditional_response(versions, lambda: jsonify(courses))
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 # Add student in a course
@@ -41,12 +93,90 @@ def add_student(course_code):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
     
+@teacher_bp.route('/courses/<course_code>/students/import', methods=['POST'])
+def import_students(course_code):
+    """Bulk import students into a course from a CSV or JSON array body"""
+    on_conflict = request.args.get('on_conflict', 'update')
+
+    try:
+        result = import_students_to_course(course_code, request.stream, request.mimetype, on_conflict)
+        return jsonify(result), 201
+    except LookupError as e:
+        return jsonify({'error': str(e)}), 404
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
 @teacher_bp.route('/courses/<course_code>/students', methods=['GET'])
+@conditional(_course_versions)
 def get_students(course_code):
     """Get all students enrolled in a course"""
+    after = request.args.get('after')
+    limit = request.args.get('limit')
+    if limit is not None:
+        try:
+            limit = int(limit)
+        except ValueError:
+            return jsonify({'error': 'limit must be an integer'}), 400
+        if not 1 <= limit <= MAX_STUDENTS_PAGE_SIZE:
+            return jsonify({'error': f'limit must be between 1 and {MAX_STUDENTS_PAGE_SIZE}'}), 400
+
+    try:
+        # Stream one JSON object per line straight from the database cursor
+        if request.args.get('format') == 'ndjson':
+            rows = iter_course_students(course_code, after, limit)
+            body = (json.dumps(row) + '\n' for row in rows)
+            return Response(stream_with_context(body), mimetype='application/x-ndjson'), 200
+
+        students = get_course_students(course_code, after, limit)
+        response = jsonify(students)
+        # Hand out the cursor for the next page when this one is full
+        if limit is not None and len(students) == limit:
+            response.headers['X-Next-After'] = students[-1]['roll_no']
+        return response, 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@teacher_bp.route('/courses/<course_code>/attendance/export', methods=['GET'])
+@conditional(_course_versions)
+def export_course_attendance(course_code):
+    """Export the students x sessions attendance matrix of a course"""
+    export_format = request.args.get('format', 'csv').lower()
+    if export_format not in EXPORT_FORMATS:
+        return jsonify({'error': f"format must be one of {', '.join(EXPORT_FORMATS)}"}), 400
+    if not format_available(export_format):
+        return jsonify({'error': f'The {export_format} format requires the pyarrow package'}), 400
+    
+    start_date_str = request.args.get('start_date')
+    end_date_str = request.args.get('end_date')
+    start_date = None
+    end_date = None
+    
+    if start_date_str:
+        try:
+            start_date = datetime.fromisoformat(start_date_str)
+        except ValueError:
+            return jsonify({'error': 'Invalid start_date format. Use ISO 8601 format.'}), 400
+    
+    if end_date_str:
+        try:
+            end_date = datetime.fromisoformat(end_date_str)
+        except ValueError:
+            return jsonify({'error': 'Invalid end_date format. Use ISO 8601 format.'}), 400
+    
     try:
-        students = get_course_students(course_code)
-        return jsonify(students), 200
+        course = Teacher.query.get(course_code)
+        if not course:
+            return jsonify({'error': 'Course not found'}), 404
+        
+        sessions = get_course_sessions(course_code, start_date, end_date)
+        rows = iter_attendance_matrix(course_code, sessions, EXPORT_CHUNK_SIZE)
+        body = export_attendance_matrix(export_format, sessions, rows, EXPORT_CHUNK_SIZE)
+        mimetype, extension = EXPORT_FORMATS[export_format]
+        response = Response(stream_with_context(body), mimetype=mimetype)
+        response.headers['Content-Disposition'] = f'attachment; filename="{course_code}-attendance.{extension}"'
+        return response, 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -64,13 +194,49 @@ def post_attendance():
     if not isinstance(roll_numbers, list):
         return jsonify({'error': 'roll_numbers must be an array'}), 400
     
+    summary = bool(data.get('summary', False))
+    
+    # Async mode only validates and queues the batch, the ingestion worker writes it
+    if data.get('async', False):
+        if not all(isinstance(roll_no, str) for roll_no in roll_numbers):
+            return jsonify({'error': 'roll_numbers must be strings'}), 400
+        idempotency_key = request.headers.get('Idempotency-Key')
+        if idempotency_key is not None and not 0 < len(idempotency_key) <= 100:
+            return jsonify({'error': 'Idempotency-Key must be 1 to 100 characters'}), 400
+        try:
+            ticket, created = enqueue_attendance(course_code, roll_numbers, idempotency_key)
+            if created:
+                wake_ingest_worker()
+            response = jsonify(ticket)
+            response.headers['Location'] = url_for('teacher.get_attendance_ticket_status', ticket_id=ticket['ticket_id'])
+            return response, 202
+        except LookupError as e:
+            return jsonify({'error': str(e)}), 404
+        except Exception as e:
+            return jsonify({'error': str(e)}), 500
+    
     try:
-        attendance_records = mark_attendance(course_code, roll_numbers)
+        attendance_records = mark_attendance(course_code, roll_numbers, summary=summary)
         return jsonify(attendance_records), 201
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@teacher_bp.route('/attendance/tickets/<ticket_id>', methods=['GET'])
+def get_attendance_ticket_status(ticket_id):
+    """Get the status of an attendance batch queued in async mode"""
+    try:
+        ticket = get_attendance_ticket(ticket_id)
+        # Tickets left by a process that went away are picked up once asked for
+        if ticket['status'] == 'pending':
+            wake_ingest_worker()
+        return jsonify(ticket), 200
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 404
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @teacher_bp.route('/attendance/stats/<student_id>', methods=['GET'])
+@conditional(_student_versions)
 def get_attendance_stats(student_id):
     """Get attendance statistics for a student"""
     try:
@@ -92,6 +258,7 @@ def get_attendance_stats(student_id):
 
 # Return attendance record for a course
 @teacher_bp.route('/attendance/stats/course/<course_code>', methods=['GET'])
+@conditional(_course_versions)
 def get_attendance_stats_for_course(course_code):
     """Get attendance statistics for a course"""
     try:
@@ -111,9 +278,90 @@ def get_attendance_stats_for_course(course_code):
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@teacher_bp.route('/attendance/stats/courses', methods=['GET'])
+@conditional(_batch_versions)
+def get_attendance_stats_for_courses():
+    """Get attendance statistics for several courses at once"""
+    course_codes = [code for code in request.args.get('course_codes', '').split(',') if code]
+    email = request.args.get('email')
+    
+    try:
+        if email:
+            course_codes += [course['course_code'] for course in get_teacher_courses(email)]
+        if not course_codes:
+            return jsonify({'error': 'course_codes or email is required'}), 400
+        if len(set(course_codes)) > MAX_BATCH_COURSES:
+            return jsonify({'error': f'At most {MAX_BATCH_COURSES} courses per request'}), 400
+        
+        start_date_str = request.args.get('start_date')
+        end_date_str = request.args.get('end_date')
+        start_date = None
+        end_date = None
+        
+        if start_date_str:
+            try:
+                start_date = datetime.fromisoformat(start_date_str)
+            except ValueError:
+                return jsonify({'error': 'Invalid start_date format. Use ISO 8601 format.'}), 400
+        
+        if end_date_str:
+            try:
+                end_date = datetime.fromisoformat(end_date_str)
+            except ValueError:
+                return jsonify({'error': 'Invalid end_date format. Use ISO 8601 format.'}), 400
+        
+        # Stream one line per course as it completes, computed in a thread pool
+        if request.args.get('stream', '').lower() in ('1', 'true'):
+            results = iter_courses_attendance_stats(
+                current_app._get_current_object(), course_codes, start_date, end_date,
+                max_workers=STATS_BATCH_WORKERS
+            )
+            body = (
+                json.dumps(stats if stats is not None else {'course_code': code, 'error': f"Course {code} not found"}) + '\n'
+                for code, stats in results
+            )
+            return Response(stream_with_context(body), mimetype='application/x-ndjson'), 200
+        
+        stats, not_found = get_courses_attendance_stats(course_codes, start_date, end_date)
+        return jsonify({'courses': stats, 'not_found': not_found}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+def _low_attendance_options(args):
+    """Threshold engine options from the query string, ValueError if invalid"""
+    try:
+        threshold = float(args.get('threshold', 75))
+        limit = int(args['limit']) if 'limit' in args else None
+        offset = int(args.get('offset', 0))
+    except ValueError:
+        raise ValueError('threshold, limit and offset must be numbers')
+    if not 0 <= threshold <= 100:
+        raise ValueError('threshold must be between 0 and 100')
+    if limit is not None and not 0 < limit <= MAX_LOW_ATTENDANCE_PAGE_SIZE:
+        raise ValueError(f'limit must be between 1 and {MAX_LOW_ATTENDANCE_PAGE_SIZE}')
+    if offset < 0:
+        raise ValueError('offset must not be negative')
+    
+    denominator = args.get('denominator', 'classes')
+    if denominator not in LOW_ATTENDANCE_DENOMINATORS:
+        raise ValueError(f"denominator must be one of {', '.join(LOW_ATTENDANCE_DENOMINATORS)}")
+    sort = args.get('sort', 'roll_no')
+    if sort not in LOW_ATTENDANCE_ORDER:
+        raise ValueError(f"sort must be one of {', '.join(LOW_ATTENDANCE_ORDER)}")
+    
+    # Whole-number thresholds keep the same cache key and output as the default
+    threshold = int(threshold) if threshold.is_integer() else threshold
+    return {'threshold': threshold, 'denominator': denominator, 'sort': sort, 'limit': limit, 'offset': offset}
+
 @teacher_bp.route('/attendance/<course_code>/low', methods=['GET'])
+@conditional(_course_versions)
 def get_low_attendance(course_code):
-    """Get students with low attendance"""
+    """Get students below an attendance threshold"""
+    try:
+        options = _low_attendance_options(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
     try:
         start_date = request.args.get('start_date')
         end_date = request.args.get('end_date')
@@ -123,7 +371,7 @@ def get_low_attendance(course_code):
         if end_date:
             end_date = datetime.fromisoformat(end_date)
         
-        stats = get_low_attendance_students(course_code, start_date, end_date)
+        stats = get_low_attendance_students(course_code, start_date, end_date, **options)
         return jsonify(stats), 200
     except ValueError as e:
         return jsonify({'error': str(e)}), 404
@@ -132,6 +380,7 @@ def get_low_attendance(course_code):
     
 # Get attendance percentage of every student in a course
 @teacher_bp.route('/attendance/stats/course/<course_code>/percentage', methods=['GET'])
+@conditional(_course_versions)
 def get_course_attendance_percentage_students(course_code):
     """Get attendance percentage of every student in a course"""
     try:
@@ -159,51 +408,8 @@ def get_course_attendance_percentage_students(course_code):
         if not course:
             return jsonify({'error': 'Course not found'}), 404
 
-        # Get all students in course
-        students = course.students
-        student_ids = [s._id for s in students]
-
-        # Build base attendance query
-        attendance_query = Attendance.query.filter(
-            Attendance.student_id.in_(student_ids)
-        )
-
-        # Apply date filters
-        if start_date:
-            attendance_query = attendance_query.filter(Attendance.class_date >= start_date)
-        if end_date:
-            attendance_query = attendance_query.filter(Attendance.class_date <= end_date)
-
-        # Get total distinct classes in date range
-        total_classes = get_total_classes(course_code, start_date, end_date)
-
-        # Calculate attendance for each student
-        student_stats = []
-        for student in students:
-            # Get student's attendance count
-            attended = attendance_query.filter(
-                Attendance.student_id == student._id
-            ).count()
-
-            # Calculate percentage
-            percentage = (attended / total_classes * 100) if total_classes > 0 else 0
-            
-            student_stats.append({
-                # 'student_id': student._id,
-                'student_name': student.name,
-                'roll_no': student.roll_no,
-                'attendance_percentage': round(percentage, 2),
-                'attended_classes': attended,
-            })
-
-        return jsonify({
-            'course_code': course_code,
-            'total_students': len(students),
-            'start_date': start_date.isoformat() if start_date else None,
-            'end_date': end_date.isoformat() if end_date else None,
-            'students': student_stats,
-            'total_classes': total_classes
-        }), 200
+        stats = get_students_attendance_percentage(course_code, start_date, end_date)
+        return jsonify(stats), 200
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
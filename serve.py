@@ -0,0 +1,126 @@
+import os
+import signal
+import time
+import logging
+
+from waitress import create_server
+from waitress.channel import HTTPChannel
+from waitress.server import BaseWSGIServer
+
+logger = logging.getLogger('teacher.serve')
+
+
+class _Shutdown(SystemExit):
+    pass
+
+
+def _env_int(name, default):
+    return int(os.environ.get(name, default))
+
+
+def waitress_options():
+    """Waitress tuning from WAITRESS_* environment variables"""
+    return {
+        'host': os.environ.get('HOST', '0.0.0.0'),
+        'port': _env_int('PORT', 8000),
+        'threads': _env_int('WAITRESS_THREADS', 8),
+        'connection_limit': _env_int('WAITRESS_CONNECTION_LIMIT', 200),
+        'backlog': _env_int('WAITRESS_BACKLOG', 1024),
+        'channel_timeout': _env_int('WAITRESS_CHANNEL_TIMEOUT', 60),
+    }
+
+
+# The graceful drain below reads waitress internals (the socket map, channel
+# buffers, task dispatcher queue) that have no public equivalent, so
+# requirements.txt pins waitress to the 3.0 series this was written against.
+
+def _socket_map(server):
+    """The asyncore map holding the listening sockets and open channels.
+
+    create_server returns a single server, which keeps it in ``_map``, or a
+    MultiSocketServer when it listens on several addresses, which keeps the map
+    shared by all its sockets in ``map``.
+    """
+    socket_map = getattr(server, 'map', None)
+    return server._map if socket_map is None else socket_map
+
+
+def _stop_accepting(socket_map):
+    for dispatcher in list(socket_map.values()):
+        if isinstance(dispatcher, BaseWSGIServer):
+            dispatcher.accepting = False
+            dispatcher.del_channel()
+            dispatcher.socket.close()
+
+
+def _has_inflight_requests(server, socket_map):
+    if server.task_dispatcher.active_count or server.task_dispatcher.queue:
+        return True
+    return any(
+        channel.requests or channel.total_outbufs_len
+        for channel in list(socket_map.values())
+        if isinstance(channel, HTTPChannel)
+    )
+
+
+def serve_waitress(app):
+    """Serve the app with a tuned waitress thread pool.
+
+    On SIGTERM/SIGINT the listening sockets are closed first, then the event
+    loop keeps running until in-flight requests are answered or GRACEFUL_TIMEOUT
+    seconds have passed.
+    """
+    options = waitress_options()
+    graceful_timeout = _env_int('GRACEFUL_TIMEOUT', 30)
+    server = create_server(app, **options)
+    socket_map = _socket_map(server)
+
+    def request_shutdown(signum, frame):
+        raise _Shutdown()
+
+    signal.signal(signal.SIGTERM, request_shutdown)
+    signal.signal(signal.SIGINT, request_shutdown)
+
+    logger.info("Serving on http://%s:%s with %s threads", options['host'], options['port'], options['threads'])
+    try:
+        server.asyncore.loop(
+            timeout=server.adj.asyncore_loop_timeout,
+            map=socket_map,
+            use_poll=server.adj.asyncore_use_poll,
+        )
+    except _Shutdown:
+        logger.info("Shutting down, waiting up to %ss for in-flight requests", graceful_timeout)
+        _stop_accepting(socket_map)
+        deadline = time.monotonic() + graceful_timeout
+        while _has_inflight_requests(server, socket_map) and time.monotonic() < deadline:
+            server.asyncore.loop(timeout=0.1, map=socket_map, use_poll=server.adj.asyncore_use_poll, count=1)
+    finally:
+        server.task_dispatcher.shutdown()
+        _dispose_engine(app)
+
+
+def _dispose_engine(app):
+    from models import db
+    with app.app_context():
+        db.engine.dispose()
+
+
+def serve_gunicorn():
+    """Replace this process with gunicorn, configured by gunicorn.conf.py"""
+    os.execvp('gunicorn', ['gunicorn', '--config', 'gunicorn.conf.py', 'app:create_app()'])
+
+
+def main():
+    logging.basicConfig(level=os.environ.get('LOG_LEVEL', 'INFO'))
+    server = os.environ.get('SERVER', 'waitress').strip().lower()
+    if server == 'gunicorn':
+        serve_gunicorn()
+    elif server == 'waitress':
+        from app import create_app
+        serve_waitress(create_app())
+    else:
+        raise SystemExit(f"Unknown SERVER {server!r}, expected waitress or gunicorn")
+
+
+if __name__ == "__main__":
+    main()
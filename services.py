@@ -1,21 +1,118 @@
-from flask import request, jsonify, make_response
-from models import *
-from datetime import datetime, timezone
-import requests
-from sqlalchemy import func
-
-def get_teacher_courses(email):
-    """Get all courses where the given email is either a teacher or TA"""
-    courses = Teacher.query.filter(
-        (Teacher.Teacher.contains([email])) | 
-        (Teacher.TA.contains([email]))
-    ).all()
-    return [course.json() for course in courses]
+from models import (
+    db, Teacher, Student, ClassSession, Attendance, AttendanceSummary,
+    CourseDailyRollup, StudentDailyRollup, AttendanceTicket
+)
+from datetime import datetime, timezone, timedelta
+from sqlalchemy import func, and_, or_, insert, update, select, union_all, cast, text, literal, case, true, false
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+import csv
+import io
+import json
+import uuid
+from bisect import bisect_left
+from fractions import Fraction
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from cache import StatsCache
+from attendance_index import AttendanceIndex, CourseIndex
+from partitions import AttendancePartitions, archive_boundary, archive_partitions, month_start
+from conditional import request_course_versions
+from metrics import ATTENDANCE_ROWS_WRITTEN
+
+# Course statistics cache keyed by course version stamps, the backend is configured by the app
+stats_cache = StatsCache(get_version=lambda course_code: _course_version(course_code))
+# In-memory attendance bitsets of hot courses, sized by the app
+attendance_index = AttendanceIndex()
+# Monthly attendance partitions known to exist, created ahead of the writes
+attendance_partitions = AttendancePartitions()
+
+def _course_row_json(row):
+    """Same shape as Teacher.json, built from a column tuple"""
+    return {
+        'course_code': row.course_code,
+        'Teacher': row.Teacher,
+        'TA': row.TA,
+        'total_classes': row.total_classes
+    }
+
+def get_teacher_courses(email, with_versions=False):
+    """Get all courses where the given email is either a teacher or TA. With
+    with_versions, returns (courses, versions) where versions maps each course
+    code to its (version, modified_at) stamp, read by the same query."""
+    columns = (Teacher.course_code, Teacher.Teacher, Teacher.TA, Teacher.total_classes)
+    if with_versions:
+        columns += (Teacher.version, Teacher.modified_at)
+    # One @> branch per array column so each can use its own GIN index
+    as_teacher = db.session.query(*columns).filter(Teacher.Teacher.contains([email]))
+    as_ta = db.session.query(*columns).filter(Teacher.TA.contains([email]))
+    rows = as_teacher.union(as_ta).order_by(Teacher.course_code).all()
+    courses = [_course_row_json(row) for row in rows]
+    if with_versions:
+        return courses, {row.course_code: (row.version, row.modified_at) for row in rows}
+    return courses
+
+# Version stamps, read by conditional GETs before any aggregation runs
+_VERSION_COLUMNS = (Teacher.course_code, Teacher.version, Teacher.modified_at)
+
+def get_course_versions(course_codes):
+    """{course_code: (version, modified_at)} of the given courses that exist"""
+    rows = db.session.query(*_VERSION_COLUMNS).filter(Teacher.course_code.in_(course_codes))
+    return {code: (version, modified_at) for code, version, modified_at in rows}
 
-def get_course_students(course_code):
-    """Get all students enrolled in a specific course"""
-    students = Student.query.filter_by(course_code=course_code).all()
-    return [student.json() for student in students]
+def _course_version(course_code):
+    """(version, modified_at) of a course, None if it does not exist. Stamps
+    a conditional GET already read for its ETag are reused."""
+    versions = request_course_versions()
+    if course_code in versions:
+        return versions[course_code]
+    return get_course_versions([course_code]).get(course_code)
+
+def get_teacher_course_versions(email):
+    """{course_code: (version, modified_at)} of the courses get_teacher_courses returns"""
+    as_teacher = db.session.query(*_VERSION_COLUMNS).filter(Teacher.Teacher.contains([email]))
+    as_ta = db.session.query(*_VERSION_COLUMNS).filter(Teacher.TA.contains([email]))
+    return {code: (version, modified_at) for code, version, modified_at in as_teacher.union(as_ta)}
+
+def get_student_course_version(student_id):
+    """{course_code: (version, modified_at)} of the student's course, empty if
+    the student does not exist"""
+    rows = (
+        db.session.query(*_VERSION_COLUMNS)
+        .join(Student, Student.course_code == Teacher.course_code)
+        .filter(Student._id == student_id)
+    )
+    return {code: (version, modified_at) for code, version, modified_at in rows}
+
+def _course_students_query(course_code, after=None, limit=None):
+    """Column-only student rows of a course in roll number order, using the
+    uix_course_roll index for keyset pagination"""
+    query = db.session.query(
+        Student._id, Student.course_code, Student.roll_no, Student.name
+    ).filter(Student.course_code == course_code)
+    if after is not None:
+        query = query.filter(Student.roll_no > after)
+    query = query.order_by(Student.roll_no)
+    if limit is not None:
+        query = query.limit(limit)
+    return query
+
+def _student_row_json(row):
+    """Same shape as Student.json, built from a column tuple"""
+    return {
+        'id': row._id,
+        'course_code': row.course_code,
+        'roll_no': row.roll_no,
+        'name': row.name
+    }
+
+def get_course_students(course_code, after=None, limit=None):
+    """Get students enrolled in a specific course, optionally one page at a time"""
+    return [_student_row_json(row) for row in _course_students_query(course_code, after, limit)]
+
+def iter_course_students(course_code, after=None, limit=None, batch_size=500):
+    """Yield students of a course from a server-side cursor, batch_size rows at a time"""
+    rows = _course_students_query(course_code, after, limit).yield_per(batch_size)
+    for row in rows:
+        yield _student_row_json(row)
 
 # Add student to a course
 def add_student_to_course(student_name, student_roll_no, course_code):
@@ -26,53 +123,595 @@ def add_student_to_course(student_name, student_roll_no, course_code):
         course_code=course_code
     )
     db.session.add(new_student)
+    Teacher.bump_version(course_code)
     db.session.commit()
+    attendance_index.invalidate(course_code)
     
-def mark_attendance(course_code, roll_numbers):
-    """Mark attendance for multiple students in a course"""
-    current_time = datetime.now(timezone.utc)
-    attendance_records = []
-    
-    # Get the course and increment total classes
+# Bulk import students into a course
+IMPORT_BATCH_SIZE = 500
+
+def _iter_csv_students(stream):
+    """Yield student rows from a CSV stream with a name,roll_no header"""
+    reader = csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8-sig', newline=''))
+    for row in reader:
+        yield row
+
+def _iter_json_students(stream, chunk_size=64 * 1024, max_item_size=64 * 1024):
+    """Yield the elements of a JSON array one by one while reading the stream in chunks.
+
+    Elements must be separated by exactly one comma and nothing but whitespace
+    may follow the closing bracket. A malformed body raises ValueError once
+    it is reached, which is before the import commits.
+    """
+    reader = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    decoder = json.JSONDecoder()
+    buffer = ''
+    eof = False
+    # '[' before the array, 'first' right after '[', 'value' after a comma,
+    # 'separator' after an element, 'end' after ']'
+    expect = '['
+
+    while True:
+        buffer = buffer.lstrip()
+        if not buffer:
+            if eof:
+                if expect == 'end':
+                    return
+                raise ValueError("Expected a complete JSON array of students")
+            chunk = reader.read(chunk_size)
+            eof = not chunk
+            buffer += chunk
+            continue
+
+        if expect == 'end':
+            raise ValueError("Unexpected data after the JSON array of students")
+        if expect == '[':
+            if buffer[0] != '[':
+                raise ValueError("Expected a JSON array of students")
+            buffer = buffer[1:]
+            expect = 'first'
+        elif buffer[0] == ']' and expect in ('first', 'separator'):
+            buffer = buffer[1:]
+            expect = 'end'
+        elif expect == 'separator':
+            if buffer[0] != ',':
+                raise ValueError("Expected ',' or ']' after a student")
+            buffer = buffer[1:]
+            expect = 'value'
+        elif buffer[0] in ',]':
+            raise ValueError("Expected a student in the JSON array")
+        else:
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                # The element may be split across chunks, read more and retry
+                if eof or len(buffer) > max_item_size:
+                    raise ValueError("Invalid JSON in student list")
+                chunk = reader.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            buffer = buffer[end:]
+            expect = 'separator'
+            yield item
+
+def _upsert_student_batch(course_code, batch, on_conflict):
+    """Insert a batch of students, returning (inserted, updated) counts"""
+    now = datetime.now(timezone.utc)
+    statement = pg_insert(Student).values([
+        {
+            '_id': str(uuid.uuid4()),
+            'course_code': course_code,
+            'roll_no': roll_no,
+            'name': name,
+            'enrolled_at': now
+        }
+        for roll_no, name in batch.items()
+    ])
+    if on_conflict == 'update':
+        # Only touch rows whose name actually changed, unchanged rows count as duplicates
+        statement = statement.on_conflict_do_update(
+            constraint='uix_course_roll',
+            set_={'name': statement.excluded.name},
+            where=Student.name != statement.excluded.name
+        )
+    else:
+        statement = statement.on_conflict_do_nothing(constraint='uix_course_roll')
+
+    # xmax is 0 only for freshly inserted row versions
+    rows = db.session.execute(statement.returning(text('xmax = 0'))).scalars().all()
+    inserted = sum(1 for is_insert in rows if is_insert)
+    return inserted, len(rows) - inserted
+
+def _import_row_fields(row_number, row):
+    """(roll_no, name) of an imported row, stripped and checked against the
+    column lengths so bad rows are rejected before anything is written"""
+    if not isinstance(row, dict):
+        raise ValueError(f"Row {row_number}: name and roll_no are required")
+    roll_no = str(row.get('roll_no') or '').strip()
+    name = str(row.get('name') or '').strip()
+    if not roll_no or not name:
+        raise ValueError(f"Row {row_number}: name and roll_no are required")
+    if len(roll_no) > Student.roll_no.type.length:
+        raise ValueError(f"Row {row_number}: roll_no is longer than {Student.roll_no.type.length} characters")
+    if len(name) > Student.name.type.length:
+        raise ValueError(f"Row {row_number}: name is longer than {Student.name.type.length} characters")
+    return roll_no, name
+
+def import_students_to_course(course_code, stream, content_type, on_conflict='update'):
+    """Bulk import students into a course from a CSV or JSON array stream.
+
+    Rows are parsed incrementally and upserted in batches against uix_course_roll,
+    all in one transaction. Returns inserted/updated/duplicate counts.
+    """
+    if on_conflict not in ('update', 'ignore'):
+        raise ValueError("on_conflict must be 'update' or 'ignore'")
+
+    if content_type == 'text/csv':
+        rows = _iter_csv_students(stream)
+    elif content_type == 'application/json':
+        rows = _iter_json_students(stream)
+    else:
+        raise ValueError("Content-Type must be text/csv or application/json")
+
     course = Teacher.query.get(course_code)
     if not course:
+        raise LookupError(f"Course {course_code} not found")
+
+    inserted = updated = total = 0
+    batch = {}
+    try:
+        for row_number, row in enumerate(rows, start=1):
+            roll_no, name = _import_row_fields(row_number, row)
+            total += 1
+            # A roll number repeated inside the same batch can't be upserted twice
+            batch[roll_no] = name
+            if len(batch) >= IMPORT_BATCH_SIZE:
+                batch_inserted, batch_updated = _upsert_student_batch(course_code, batch, on_conflict)
+                inserted += batch_inserted
+                updated += batch_updated
+                batch = {}
+        if batch:
+            batch_inserted, batch_updated = _upsert_student_batch(course_code, batch, on_conflict)
+            inserted += batch_inserted
+            updated += batch_updated
+        Teacher.bump_version(course_code)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    attendance_index.invalidate(course_code)
+
+    return {
+        'course_code': course_code,
+        'total_rows': total,
+        'inserted': inserted,
+        'updated': updated,
+        'duplicates': total - inserted - updated
+    }
+    
+def mark_attendance(course_code, roll_numbers, summary=False):
+    """Mark attendance for multiple students in a course.
+
+    Everything is written in a single transaction: the class counter is bumped
+    server-side, the session is recorded and all attendance rows go in with one
+    executemany. With summary=True only the number of marked students and the
+    unknown roll numbers are returned instead of every record.
+    """
+    current_time = datetime.now(timezone.utc)
+    sessions = [(current_time, roll_numbers)]
+    if not attendance_partitions.known([current_time]):
+        # Unknown course codes must not get to create partitions
+        if db.session.query(Teacher.course_code).filter(Teacher.course_code == course_code).first() is None:
+            raise ValueError(f"Course {course_code} not found")
+        attendance_partitions.ensure(db.engine, [current_time])
+    
+    try:
+        version, results = _write_class_sessions(course_code, sessions)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    [(session_id, records, found)] = results
+    ATTENDANCE_ROWS_WRITTEN.inc(len(records))
+    _index_written_sessions(course_code, version, sessions, results)
+    
+    if summary:
+        return _attendance_summary_json(course_code, session_id, records, roll_numbers, found)
+    
+    # class_date is stored without a timezone, echo it the way it reads back
+    class_date = current_time.replace(tzinfo=None).isoformat()
+    return [
+        {
+            'id': record['id'],
+            'student_id': record['student_id'],
+            'class_date': class_date
+        }
+        for record in records
+    ]
+
+def _attendance_summary_json(course_code, session_id, records, roll_numbers, found):
+    return {
+        'course_code': course_code,
+        'session_id': session_id,
+        'marked': len(records),
+        'unknown_roll_numbers': list(dict.fromkeys(r for r in roll_numbers if r not in found))
+    }
+
+def _write_class_sessions(course_code, sessions):
+    """Write one or more class sessions of a course in the current transaction.
+
+    sessions is a list of (held_at, roll_numbers). However many sessions are
+    given, the class counter, roll number lookup, session rows, attendance rows,
+    summary counters and daily rollups each take a single statement. Returns the
+    course's new version and a (session_id, attendance_records, found_roll_numbers)
+    tuple per session. The attendance partitions of the sessions' months must
+    exist already, see attendance_partitions.ensure.
+    """
+    # Increment total classes atomically, this also tells us whether the course exists
+    counted = Teacher.increment_total_classes_for_course(course_code, len(sessions), with_version=True)
+    if counted is None:
         raise ValueError(f"Course {course_code} not found")
     
-    # Get all students with the given roll numbers in the course
-    students = Student.query.filter(
+    # Resolve roll numbers to student ids without loading full Student objects
+    all_roll_numbers = {roll_no for _, roll_numbers in sessions for roll_no in roll_numbers}
+    student_ids = dict(db.session.query(Student.roll_no, Student._id).filter(
         Student.course_code == course_code,
-        Student.roll_no.in_(roll_numbers)
-    ).all()
+        Student.roll_no.in_(all_roll_numbers)
+    ).all())
     
-    # Create attendance records
-    for student in students:
-        attendance = Attendance(
-            student_id=student._id,
-            class_date=current_time
-        )
-        attendance_records.append(attendance)
+    session_rows = []
+    attendance_records = []
+    results = []
+    for held_at, roll_numbers in sessions:
+        # Record the class session itself, even if nobody attends it
+        session_id = str(uuid.uuid4())
+        session_rows.append({'id': session_id, 'course_code': course_code, 'started_at': held_at})
+        found = [roll_no for roll_no in dict.fromkeys(roll_numbers) if roll_no in student_ids]
+        records = [
+            {
+                'id': str(uuid.uuid4()),
+                'student_id': student_ids[roll_no],
+                'session_id': session_id,
+                'class_date': held_at
+            }
+            for roll_no in found
+        ]
+        attendance_records.extend(records)
+        results.append((session_id, records, set(found)))
     
-    # First increment total classes
-    course.increment_total_classes()
-    db.session.flush()  # Ensure the increment is saved
+    db.session.execute(insert(ClassSession), session_rows)
+    if attendance_records:
+        db.session.execute(insert(Attendance), attendance_records)
+        _increment_attendance_summary(course_code, attendance_records)
+    _increment_daily_rollup(course_code, session_rows, attendance_records)
+    return counted.version, results
+
+def _index_written_sessions(course_code, version, sessions, results):
+    """Append committed sessions to the in-memory attendance index of the course"""
+    attendance_index.record_sessions(course_code, version, [
+        (session_id, _to_utc_naive(held_at), [record['student_id'] for record in records])
+        for (held_at, _), (session_id, records, _) in zip(sessions, results)
+    ])
     
-    # Then add attendance records
-    db.session.add_all(attendance_records)
+def enqueue_attendance(course_code, roll_numbers, idempotency_key=None):
+    """Queue an attendance batch for the ingestion worker.
+
+    Returns the ticket and whether it was created. A retry carrying an
+    idempotency key already used for the course gets the original ticket back
+    instead of queuing a second class session.
+    """
+    if db.session.query(Teacher.course_code).filter(Teacher.course_code == course_code).first() is None:
+        raise LookupError(f"Course {course_code} not found")
+
+    statement = pg_insert(AttendanceTicket).values(
+        id=str(uuid.uuid4()),
+        course_code=course_code,
+        roll_numbers=list(roll_numbers),
+        idempotency_key=idempotency_key,
+        status='pending',
+        created_at=datetime.now(timezone.utc)
+    ).on_conflict_do_nothing(constraint='uix_ticket_idempotency').returning(AttendanceTicket.id)
+
+    try:
+        ticket_id = db.session.execute(statement).scalar()
+        created = ticket_id is not None
+        if created:
+            ticket = db.session.get(AttendanceTicket, ticket_id)
+        else:
+            ticket = AttendanceTicket.query.filter_by(course_code=course_code, idempotency_key=idempotency_key).one()
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    return ticket.json(), created
+
+def get_attendance_ticket(ticket_id):
+    """Get the status of a queued attendance batch"""
+    ticket = db.session.get(AttendanceTicket, ticket_id)
+    if not ticket:
+        raise ValueError(f"Ticket {ticket_id} not found")
+    return ticket.json()
+
+INGEST_BATCH_SIZE = 200
+
+def apply_pending_tickets(limit=INGEST_BATCH_SIZE):
+    """Apply up to limit queued attendance tickets, oldest first, and return how
+    many were processed.
+
+    Tickets are claimed with FOR UPDATE SKIP LOCKED so several workers can drain
+    the queue, and all tickets of a course are written with one bulk write. Each
+    session keeps the time its ticket was accepted. A course whose write fails
+    has its tickets marked failed without affecting the other courses.
+    """
+    try:
+        tickets = (
+            AttendanceTicket.query
+            .filter(AttendanceTicket.status == 'pending')
+            .order_by(AttendanceTicket.created_at)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+            .all()
+        )
+        by_course = {}
+        for ticket in tickets:
+            by_course.setdefault(ticket.course_code, []).append(ticket)
+        # Before any course is written, creating a partition waits for open writes
+        attendance_partitions.ensure(db.engine, [ticket.created_at for ticket in tickets])
+
+        applied_at = datetime.now(timezone.utc)
+        written = {}
+        for course_code, course_tickets in by_course.items():
+            sessions = [(ticket.created_at, ticket.roll_numbers) for ticket in course_tickets]
+            try:
+                with db.session.begin_nested():
+                    version, results = _write_class_sessions(course_code, sessions)
+            except Exception as e:
+                for ticket in course_tickets:
+                    ticket.status = 'failed'
+                    ticket.error = str(e)
+                    ticket.applied_at = applied_at
+                continue
+
+            for ticket, (session_id, records, found) in zip(course_tickets, results):
+                ticket.status = 'applied'
+                ticket.applied_at = applied_at
+                ticket.session_id = session_id
+                ticket.marked = len(records)
+                ticket.unknown_roll_numbers = list(dict.fromkeys(r for r in ticket.roll_numbers if r not in found))
+            written[course_code] = (version, sessions, results)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    for course_code, (version, sessions, results) in written.items():
+        ATTENDANCE_ROWS_WRITTEN.inc(sum(len(records) for _, records, _ in results))
+        _index_written_sessions(course_code, version, sessions, results)
+    return len(tickets)
+
+def _increment_attendance_summary(course_code, attendance_records):
+    """Add the given attendance rows to the summary rows of their students"""
+    counts = {}
+    for record in attendance_records:
+        attended, last_attended_at = counts.get(record['student_id'], (0, record['class_date']))
+        counts[record['student_id']] = (attended + 1, max(last_attended_at, record['class_date']))
+    statement = pg_insert(AttendanceSummary).values([
+        {
+            'student_id': student_id,
+            'course_code': course_code,
+            'attended_count': attended,
+            'last_attended_at': last_attended_at
+        }
+        for student_id, (attended, last_attended_at) in counts.items()
+    ])
+    statement = statement.on_conflict_do_update(
+        index_elements=[AttendanceSummary.student_id],
+        set_={
+            'attended_count': AttendanceSummary.attended_count + statement.excluded.attended_count,
+            'last_attended_at': func.greatest(AttendanceSummary.last_attended_at, statement.excluded.last_attended_at)
+        }
+    )
+    db.session.execute(statement)
+
+def rebuild_attendance_summary(course_code=None):
+    """Recompute attendance_summary and teacher.total_classes from the attendance
+    and class_session tables, for one course or all of them. Archived months
+    are counted from the student rollups, which keep them."""
+    summary = AttendanceSummary.__table__.delete()
+    attended = (
+        select(
+            Attendance.student_id,
+            Student.course_code,
+            func.count(Attendance.id).label('attended'),
+            func.max(Attendance.class_date).label('last_attended_at')
+        )
+        .join(Student, Student._id == Attendance.student_id)
+        .group_by(Attendance.student_id, Student.course_code)
+    )
+    # Months before the first attached partition were archived, only day
+    # precision is left of their last attendance
+    boundary = archive_boundary(db.session.connection())
+    archived = (
+        select(
+            StudentDailyRollup.student_id,
+            StudentDailyRollup.course_code,
+            func.sum(StudentDailyRollup.attended),
+            cast(func.max(StudentDailyRollup.day), db.DateTime)
+        )
+        .where(StudentDailyRollup.day < boundary.date() if boundary is not None else false())
+        .group_by(StudentDailyRollup.student_id, StudentDailyRollup.course_code)
+    )
+    session_count = (
+        db.session.query(func.count(ClassSession.id))
+        .filter(ClassSession.course_code == Teacher.course_code)
+        .scalar_subquery()
+    )
+    courses = update(Teacher).values(total_classes=session_count, **Teacher.version_bump())
+
+    if course_code is not None:
+        summary = summary.where(AttendanceSummary.course_code == course_code)
+        attended = attended.where(Student.course_code == course_code, *_course_class_date_bounds(course_code))
+        archived = archived.where(StudentDailyRollup.course_code == course_code)
+        courses = courses.where(Teacher.course_code == course_code)
+
+    combined = union_all(attended, archived).subquery()
+    counts = (
+        select(
+            combined.c.student_id,
+            combined.c.course_code,
+            func.sum(combined.c.attended),
+            func.max(combined.c.last_attended_at)
+        )
+        .group_by(combined.c.student_id, combined.c.course_code)
+    )
+
+    try:
+        db.session.execute(summary)
+        db.session.execute(
+            insert(AttendanceSummary).from_select(
+                ['student_id', 'course_code', 'attended_count', 'last_attended_at'],
+                counts
+            )
+        )
+        db.session.execute(courses.execution_options(synchronize_session=False))
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if course_code is not None:
+        attendance_index.invalidate(course_code)
+    else:
+        attendance_index.clear()
+
+def _increment_daily_rollup(course_code, session_rows, attendance_records):
+    """Count the given sessions, and each student's attended classes, in the day's rollups"""
+    course_days = {}
+    for row in session_rows:
+        day = _to_utc_naive(row['started_at']).date()
+        course_days.setdefault(day, [0, 0])[0] += 1
+    student_days = {}
+    for record in attendance_records:
+        day = _to_utc_naive(record['class_date']).date()
+        course_days[day][1] += 1
+        key = (record['student_id'], day)
+        student_days[key] = student_days.get(key, 0) + 1
+
+    course_rows = pg_insert(CourseDailyRollup).values([
+        {'course_code': course_code, 'day': day, 'sessions': sessions, 'attendance': attendance}
+        for day, (sessions, attendance) in course_days.items()
+    ])
+    db.session.execute(course_rows.on_conflict_do_update(
+        index_elements=[CourseDailyRollup.course_code, CourseDailyRollup.day],
+        set_={
+            'sessions': CourseDailyRollup.sessions + course_rows.excluded.sessions,
+            'attendance': CourseDailyRollup.attendance + course_rows.excluded.attendance
+        }
+    ))
+
+    if student_days:
+        student_rows = pg_insert(StudentDailyRollup).values([
+            {'student_id': student_id, 'day': day, 'course_code': course_code, 'attended': attended}
+            for (student_id, day), attended in student_days.items()
+        ])
+        db.session.execute(student_rows.on_conflict_do_update(
+            index_elements=[StudentDailyRollup.student_id, StudentDailyRollup.day],
+            set_={'attended': StudentDailyRollup.attended + student_rows.excluded.attended}
+        ))
+
+def rebuild_daily_rollup(course_code=None):
+    """Recompute the daily rollups from the class_session and attendance tables,
+    for one course or all of them. Days of archived months keep their rows,
+    their attendance rows are gone."""
+    session_day = cast(ClassSession.started_at, db.Date)
+    attendance_day = cast(Attendance.class_date, db.Date)
+
+    sessions = (
+        select(ClassSession.course_code, session_day, func.count(ClassSession.id))
+        .group_by(ClassSession.course_code, session_day)
+    )
+    course_attendance = (
+        select(Student.course_code, attendance_day, func.count(Attendance.id))
+        .join(Student, Student._id == Attendance.student_id)
+        .group_by(Student.course_code, attendance_day)
+    )
+    student_attendance = (
+        select(Attendance.student_id, attendance_day, Student.course_code, func.count(Attendance.id))
+        .join(Student, Student._id == Attendance.student_id)
+        .group_by(Attendance.student_id, attendance_day, Student.course_code)
+    )
+    boundary = archive_boundary(db.session.connection())
+    course_rows = CourseDailyRollup.__table__.delete()
+    student_rows = StudentDailyRollup.__table__.delete()
+    if boundary is not None:
+        sessions = sessions.where(ClassSession.started_at >= boundary)
+        course_rows = course_rows.where(CourseDailyRollup.day >= boundary.date())
+        student_rows = student_rows.where(StudentDailyRollup.day >= boundary.date())
+
+    if course_code is not None:
+        class_date_bounds = _course_class_date_bounds(course_code)
+        sessions = sessions.where(ClassSession.course_code == course_code)
+        course_attendance = course_attendance.where(Student.course_code == course_code, *class_date_bounds)
+        student_attendance = student_attendance.where(Student.course_code == course_code, *class_date_bounds)
+        course_rows = course_rows.where(CourseDailyRollup.course_code == course_code)
+        student_rows = student_rows.where(StudentDailyRollup.course_code == course_code)
+
+    try:
+        db.session.execute(course_rows)
+        db.session.execute(student_rows)
+        db.session.execute(
+            pg_insert(CourseDailyRollup).from_select(['course_code', 'day', 'sessions'], sessions)
+        )
+        attendance_rows = pg_insert(CourseDailyRollup).from_select(['course_code', 'day', 'attendance'], course_attendance)
+        db.session.execute(attendance_rows.on_conflict_do_update(
+            index_elements=[CourseDailyRollup.course_code, CourseDailyRollup.day],
+            set_={'attendance': attendance_rows.excluded.attendance}
+        ))
+        db.session.execute(
+            insert(StudentDailyRollup).from_select(['student_id', 'day', 'course_code', 'attended'], student_attendance)
+        )
+        Teacher.bump_version(course_code)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    if course_code is not None:
+        attendance_index.invalidate(course_code)
+    else:
+        attendance_index.clear()
+
+def archive_attendance(before, drop=False):
+    """Archive the attendance partitions of every month before the month of
+    `before`, see partitions.archive_partitions, and return their names.
+
+    Courses that held classes in those months get their version advanced once
+    the rows are gone, as their exports change. The session is committed
+    first: detaching waits for every transaction that has read attendance,
+    and would otherwise wait on the session's own forever.
+    """
     db.session.commit()
-    
-    return [record.json() for record in attendance_records]
-    
+    archived = archive_partitions(db.engine, before, drop)
+    if not archived:
+        return archived
+    held_classes = select(ClassSession.course_code).where(ClassSession.started_at < month_start(before))
+    try:
+        db.session.execute(
+            update(Teacher)
+            .where(Teacher.course_code.in_(held_classes))
+            .values(**Teacher.version_bump())
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+    attendance_index.clear()
+    return archived
+
 def get_student_attendance_stats(student_id, start_date=None, end_date=None):
     """Get attendance statistics for a student"""
-    # Base query for attendance records
-    query = Attendance.query.filter(Attendance.student_id == student_id)
-    
-    # Apply date filters if provided
-    if start_date:
-        query = query.filter(Attendance.class_date >= start_date)
-    if end_date:
-        query = query.filter(Attendance.class_date <= end_date)
-    
     # Get the student and their course
     student = Student.query.get(student_id)
     if not student:
@@ -82,11 +721,17 @@ def get_student_attendance_stats(student_id, start_date=None, end_date=None):
     if not course:
         raise ValueError(f"Course {student.course_code} not found")
     
-    # Always calculate total classes from attendance records
     total_classes = get_total_classes(student.course_code, start_date, end_date)
     
-    # Get attended classes
-    attended_classes = query.count()
+    # Get attended classes, undated requests read the maintained summary
+    if start_date or end_date:
+        attended_classes = db.session.query(_student_range_attended(student_id, start_date, end_date)).scalar()
+    else:
+        attended_classes = (
+            db.session.query(AttendanceSummary.attended_count)
+            .filter(AttendanceSummary.student_id == student_id)
+            .scalar()
+        ) or 0
     
     # Calculate percentage
     attendance_percentage = (attended_classes / total_classes * 100) if total_classes != 0 else 0
@@ -104,35 +749,59 @@ def get_student_attendance_stats(student_id, start_date=None, end_date=None):
     }
     
 # get attendance stats for a course
+@stats_cache.cached('course_stats')
 def get_course_attendance_stats(course_code, start_date=None, end_date=None):
     """Get attendance statistics for a course"""
-    # Base query for attendance records
-    query = Attendance.query.filter(Attendance.student_id.in_([s._id for s in Teacher.query.get(course_code).students]))
-    
-    # Apply date filters if provided
-    if start_date:
-        query = query.filter(Attendance.class_date >= start_date)
-    if end_date:
-        query = query.filter(Attendance.class_date <= end_date)
-    
-    # Get total classes in the date range
-    total_classes = query.distinct(Attendance.class_date).count()
-    
-    # Get attended classes
-    attended_classes = query.count()
-    # get total students
-    total_students = len(Teacher.query.get(course_code).students)
-    
-    # Calculate actual possible attendance (accounting for students who joined later)
-    total_possible_attendance = 0
-    for student in Teacher.query.get(course_code).students:
-        student_attendance = Attendance.query.filter(
-            Attendance.student_id == student._id,
-            Attendance.class_date >= (start_date or datetime.min.replace(tzinfo=timezone.utc)),
-            Attendance.class_date <= (end_date or datetime.max.replace(tzinfo=timezone.utc))
-        ).count()
-        total_possible_attendance += student_attendance
-    
+    index = _course_index(course_code)
+    if index is not None:
+        return _course_stats_json(
+            course_code, start_date, end_date,
+            *index.course_totals(_to_utc_naive(start_date), _to_utc_naive(end_date))
+        )
+
+    course = Teacher.query.get(course_code)
+    if not course:
+        raise ValueError(f"Course {course_code} not found")
+
+    # Class sessions held for the course in the date range
+    sessions = _course_sessions_query(course_code, start_date, end_date).subquery()
+
+    if start_date or end_date:
+        total_classes, attended_classes = _course_range_totals(course_code, start_date, end_date)
+    else:
+        # Undated stats come from the maintained counters
+        total_classes = _course_total_classes_subquery(course_code)
+        attended_classes = (
+            db.session.query(func.coalesce(func.sum(AttendanceSummary.attended_count), 0))
+            .filter(AttendanceSummary.course_code == course_code)
+            .scalar_subquery()
+        )
+
+    # Possible attendance is every (student, session) pair, counting only the
+    # sessions held after the student enrolled
+    total_possible_attendance = (
+        db.session.query(func.count())
+        .select_from(Student)
+        .join(sessions, or_(
+            Student.enrolled_at.is_(None),
+            sessions.c.started_at >= Student.enrolled_at
+        ))
+        .filter(Student.course_code == course_code)
+        .scalar_subquery()
+    )
+
+    total_students = (
+        db.session.query(func.count(Student._id))
+        .filter(Student.course_code == course_code)
+        .scalar_subquery()
+    )
+
+    return _course_stats_json(course_code, start_date, end_date, *db.session.query(
+        total_classes, attended_classes, total_possible_attendance, total_students
+    ).one())
+
+def _course_stats_json(course_code, start_date, end_date, total_classes, attended_classes,
+                       total_possible_attendance, total_students):
     attendance_percentage = (attended_classes / total_possible_attendance * 100) if total_possible_attendance > 0 else 0
     
     return {
@@ -145,110 +814,596 @@ def get_course_attendance_stats(course_code, start_date=None, end_date=None):
         'total_students': total_students
     }
 
+def get_courses_attendance_stats(course_codes, start_date=None, end_date=None):
+    """Get attendance statistics for several courses from a few grouped queries.
+
+    Returns the stats of every existing course, in the same shape as
+    get_course_attendance_stats and in the order given, plus the codes of the
+    courses that were not found.
+    """
+    course_codes = list(dict.fromkeys(course_codes))
+    maintained_totals = dict(
+        db.session.query(Teacher.course_code, Teacher.total_classes)
+        .filter(Teacher.course_code.in_(course_codes))
+        .all()
+    )
+    found = [code for code in course_codes if code in maintained_totals]
+    not_found = [code for code in course_codes if code not in maintained_totals]
+    if not found:
+        return [], not_found
+
+    if start_date or end_date:
+        total_classes, attended_classes = _courses_range_totals(found, start_date, end_date)
+    else:
+        # Undated stats come from the maintained counters
+        total_classes = maintained_totals
+        attended_classes = dict(
+            db.session.query(AttendanceSummary.course_code, func.sum(AttendanceSummary.attended_count))
+            .filter(AttendanceSummary.course_code.in_(found))
+            .group_by(AttendanceSummary.course_code)
+            .all()
+        )
+
+    # Possible attendance per course, counting only sessions held after each student enrolled
+    sessions = _courses_sessions_query(found, start_date, end_date).subquery()
+    total_possible_attendance = dict(
+        db.session.query(Student.course_code, func.count())
+        .join(sessions, (sessions.c.course_code == Student.course_code) & or_(
+            Student.enrolled_at.is_(None),
+            sessions.c.started_at >= Student.enrolled_at
+        ))
+        .filter(Student.course_code.in_(found))
+        .group_by(Student.course_code)
+        .all()
+    )
+    total_students = dict(
+        db.session.query(Student.course_code, func.count(Student._id))
+        .filter(Student.course_code.in_(found))
+        .group_by(Student.course_code)
+        .all()
+    )
+
+    stats = [
+        _course_stats_json(
+            code, start_date, end_date,
+            total_classes.get(code, 0), attended_classes.get(code, 0),
+            total_possible_attendance.get(code, 0), total_students.get(code, 0)
+        )
+        for code in found
+    ]
+    return stats, not_found
+
+def iter_courses_attendance_stats(app, course_codes, start_date=None, end_date=None, max_workers=4):
+    """Yield (course_code, stats) for several courses as each one completes.
+
+    Courses are computed in a thread pool, each in its own app context and so
+    with its own session and pooled connection. stats is None for a course that
+    does not exist.
+    """
+    def compute(course_code):
+        with app.app_context():
+            try:
+                return course_code, get_course_attendance_stats(course_code, start_date, end_date)
+            except ValueError:
+                return course_code, None
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    try:
+        futures = [executor.submit(compute, code) for code in dict.fromkeys(course_codes)]
+        for future in as_completed(futures):
+            yield future.result()
+    finally:
+        # A client that disconnects mid-stream should not keep the pool busy
+        executor.shutdown(wait=False, cancel_futures=True)
+
 def get_total_classes(course_code, start_date=None, end_date=None):
     """Helper function to get total classes consistently"""
-    query = Attendance.query.filter(
-        Attendance.student_id.in_([s._id for s in Teacher.query.get(course_code).students])
+    if start_date or end_date:
+        total_classes, _ = _course_range_totals(course_code, start_date, end_date, attendance=False)
+        return db.session.query(total_classes).scalar()
+    return db.session.query(_course_total_classes_subquery(course_code)).scalar() or 0
+
+def get_course_sessions(course_code, start_date=None, end_date=None):
+    """(id, started_at) of the class sessions of a course in a date range, oldest first"""
+    return [
+        (session.id, session.started_at)
+        for session in _course_sessions_query(course_code, start_date, end_date)
+        .with_entities(ClassSession.id, ClassSession.started_at)
+        .order_by(ClassSession.started_at)
+    ]
+
+def iter_attendance_matrix(course_code, sessions, batch_size=500):
+    """Yield (student_id, roll_no, name, enrolled_at, attended) for every student
+    of a course in roll number order. attended is an int bitmask over sessions,
+    bit i set when the student attended sessions[i].
+
+    The matrix comes from one outer join ordered by student and read from a
+    server-side cursor, so only batch_size rows are held at a time. Attendance
+    is only read between the first and last of the sessions, so only the
+    partitions of those months are scanned.
+    """
+    ordinals = {session_id: ordinal for ordinal, (session_id, _) in enumerate(sessions)}
+    attended_in_range = [Attendance.student_id == Student._id, *_session_class_date_bounds(sessions)]
+
+    rows = (
+        db.session.query(Student._id, Student.roll_no, Student.name, Student.enrolled_at, Attendance.session_id)
+        .outerjoin(Attendance, and_(*attended_in_range))
+        .filter(Student.course_code == course_code)
+        .order_by(Student.roll_no)
+        .yield_per(batch_size)
     )
-    if start_date:
-        query = query.filter(Attendance.class_date >= start_date)
-    if end_date:
-        query = query.filter(Attendance.class_date <= end_date)
-    return query.distinct(Attendance.class_date).count()
-
-# fetch student having <75% attendance
-def get_low_attendance_students(course_code, start_date=None, end_date=None):
-    """Return students with <75% attendance in a course"""
-    # Fetch the course
-    course = Teacher.query.get(course_code)
-    if not course:
-        return {'error': 'Course not found'}, 404
 
-    # Get all student IDs in the course
-    student_ids = [student._id for student in course.students]
+    student = None
+    attended = 0
+    for student_id, roll_no, name, enrolled_at, session_id in rows:
+        if student is None or student[0] != student_id:
+            if student is not None:
+                yield student + (attended,)
+            student = (student_id, roll_no, name, enrolled_at)
+            attended = 0
+        ordinal = ordinals.get(session_id)
+        if ordinal is not None:
+            attended |= 1 << ordinal
+    if student is not None:
+        yield student + (attended,)
+
+def _session_class_date_bounds(sessions):
+    """class_date conditions covering (id, started_at) sessions, oldest first.
+    Attendance rows carry their session's start time, so no row of these
+    sessions is left out while the partitions of other months are pruned."""
+    if not sessions:
+        return [false()]
+    return [Attendance.class_date >= sessions[0][1], Attendance.class_date <= sessions[-1][1]]
+
+def _course_class_date_bounds(course_code):
+    """class_date conditions covering every session of a course"""
+    first, last = (
+        db.session.query(func.min(ClassSession.started_at), func.max(ClassSession.started_at))
+        .filter(ClassSession.course_code == course_code)
+        .one()
+    )
+    return _session_class_date_bounds([(None, first), (None, last)] if first is not None else [])
+
+def _course_index_stamp(course_code):
+    """Version of a course, None if it does not exist. Every write to the
+    course advances it, renames and imports made by other processes included."""
+    stamp = _course_version(course_code)
+    return stamp[0] if stamp is not None else None
+
+def _load_course_index(course_code):
+    """Build the in-memory attendance index of a course from the database"""
+    # Read the stamp first, a write racing the load then only forces a reload
+    stamp = _course_index_stamp(course_code)
+    if stamp is None:
+        return None
+    sessions = get_course_sessions(course_code)
+    # Archived attendance is only left in the counters, such courses are answered from them
+    boundary = archive_boundary(db.session.connection())
+    if sessions and boundary is not None and sessions[0][1] < boundary:
+        return None
+    return CourseIndex(stamp, sessions, iter_attendance_matrix(course_code, sessions))
+
+def _course_index(course_code):
+    """The in-memory attendance index of a course, or None when the index is
+    disabled, the course does not exist or some of its attendance is archived"""
+    if not attendance_index.enabled:
+        return None
+    return attendance_index.get(course_code, _course_index_stamp, _load_course_index)
+
+def _course_total_classes_subquery(course_code):
+    """Maintained session count of a course, kept in step with class_session"""
+    return (
+        db.session.query(Teacher.total_classes)
+        .filter(Teacher.course_code == course_code)
+        .scalar_subquery()
+    )
+
+def _course_sessions_query(course_code, start_date=None, end_date=None):
+    """Class sessions of a course, restricted to a date range"""
+    return _courses_sessions_query([course_code], start_date, end_date)
+
+def _courses_sessions_query(course_codes, start_date=None, end_date=None):
+    """Class sessions of several courses, restricted to a date range"""
+    start, end = _to_utc_naive(start_date), _to_utc_naive(end_date)
+    query = ClassSession.query.filter(ClassSession.course_code.in_(course_codes))
+    if start:
+        query = query.filter(ClassSession.started_at >= start)
+    if end:
+        query = query.filter(ClassSession.started_at <= end)
+    return query
+
+def _course_attendance_query(course_code, date_filters):
+    """Attendance rows of all students in a course, restricted to a date range"""
+    return (
+        db.session.query(Attendance)
+        .join(Student, Student._id == Attendance.student_id)
+        .filter(Student.course_code == course_code, *date_filters)
+    )
+
+_DAY_START = datetime.min.time()
+_DAY_END = datetime.max.time()
+
+def _to_utc_naive(value):
+    """class_date and started_at are stored as naive UTC, bring aware datetimes
+    in line with them. Every date range goes through this before it reaches SQL
+    or the index, so PostgreSQL's session time zone never comes into it."""
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone(timezone.utc).replace(tzinfo=None)
+    return value
+
+def _split_date_range(start_date=None, end_date=None):
+    """Split an inclusive date range into whole UTC days, answered from the daily
+    rollups, and partial days at the edges, answered from raw rows.
+
+    Returns (days, edges). days is a (first_day, last_day) pair where None leaves
+    that side open, or None when the range covers no whole day. edges is a list of
+    (start, end, end_inclusive) ranges.
+    """
+    start = _to_utc_naive(start_date)
+    end = _to_utc_naive(end_date)
+
+    first_day = last_day = None
+    if start is not None:
+        first_day = start.date() if start.time() == _DAY_START else start.date() + timedelta(days=1)
+    if end is not None:
+        last_day = end.date() if end.time() == _DAY_END else end.date() - timedelta(days=1)
+    if first_day is not None and last_day is not None and first_day > last_day:
+        return None, [(start, end, True)]
+
+    edges = []
+    if start is not None and start.time() != _DAY_START:
+        edges.append((start, datetime.combine(first_day, _DAY_START), False))
+    if end is not None and end.time() != _DAY_END:
+        edges.append((datetime.combine(last_day + timedelta(days=1), _DAY_START), end, True))
+    return (first_day, last_day), edges
+
+def _day_conditions(column, days):
+    first_day, last_day = days
+    conditions = []
+    if first_day is not None:
+        conditions.append(column >= first_day)
+    if last_day is not None:
+        conditions.append(column <= last_day)
+    return conditions
+
+def _edge_conditions(column, edge):
+    start, end, end_inclusive = edge
+    return [column >= start, column <= end if end_inclusive else column < end]
+
+def _course_range_totals(course_code, start_date=None, end_date=None, attendance=True):
+    """SQL expressions for the sessions and attendance rows of a course in a
+    date range, read from the CTE of _courses_range_counts. With attendance=False
+    only the sessions are counted and the second one means nothing."""
+    counts = _courses_range_counts([course_code], start_date, end_date, attendance)
+    return tuple(
+        func.coalesce(select(column).scalar_subquery(), 0)
+        for column in (counts.c.sessions, counts.c.attendance)
+    )
+
+def _courses_range_totals(course_codes, start_date=None, end_date=None):
+    """Sessions and attendance rows per course in a date range, as two dicts,
+    from one statement"""
+    rows = db.session.execute(select(_courses_range_counts(course_codes, start_date, end_date))).all()
+    return {row[0]: row[1] for row in rows}, {row[0]: row[2] for row in rows}
+
+def _courses_range_counts(course_codes, start_date=None, end_date=None, attendance=True):
+    """CTE of (course_code, sessions, attendance) for courses in a date range,
+    summed from the daily rollup plus raw rows for partial days. A CTE so that
+    reading both columns of one course computes it once. attendance=False skips
+    the raw attendance rows for callers that only need the sessions."""
+    days, edges = _split_date_range(start_date, end_date)
+    parts = []
+
+    if days is not None:
+        parts.append(
+            select(CourseDailyRollup.course_code, CourseDailyRollup.sessions, CourseDailyRollup.attendance)
+            .where(CourseDailyRollup.course_code.in_(course_codes), *_day_conditions(CourseDailyRollup.day, days))
+        )
+    for edge in edges:
+        parts.append(
+            select(ClassSession.course_code, func.count(ClassSession.id), literal(0))
+            .where(ClassSession.course_code.in_(course_codes), *_edge_conditions(ClassSession.started_at, edge))
+            .group_by(ClassSession.course_code)
+        )
+        if attendance:
+            parts.append(
+                select(Student.course_code, literal(0), func.count(Attendance.id))
+                .join(Student, Student._id == Attendance.student_id)
+                .where(Student.course_code.in_(course_codes), *_edge_conditions(Attendance.class_date, edge))
+                .group_by(Student.course_code)
+            )
+
+    counts = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+    course_code, sessions, attended = counts.c
+    return (
+        select(
+            course_code.label('course_code'),
+            cast(func.sum(sessions), db.Integer).label('sessions'),
+            cast(func.sum(attended), db.Integer).label('attendance')
+        )
+        .group_by(course_code)
+        .cte()
+    )
+
+def _student_range_counts(course_code, start_date=None, end_date=None):
+    """Subquery of (student_id, attended) for every student of a course with
+    attendance in a date range, from the daily rollup plus raw rows for partial days"""
+    days, edges = _split_date_range(start_date, end_date)
+    parts = []
+
+    if days is not None:
+        parts.append(
+            select(StudentDailyRollup.student_id, StudentDailyRollup.attended.label('attended'))
+            .where(StudentDailyRollup.course_code == course_code, *_day_conditions(StudentDailyRollup.day, days))
+        )
+    for edge in edges:
+        parts.append(
+            select(Attendance.student_id, func.count(Attendance.id).label('attended'))
+            .join(Student, Student._id == Attendance.student_id)
+            .where(Student.course_code == course_code, *_edge_conditions(Attendance.class_date, edge))
+            .group_by(Attendance.student_id)
+        )
 
-    # Base attendance query with date filters
-    attendance_query = Attendance.query.filter(
-        Attendance.student_id.in_(student_ids)
+    counts = (union_all(*parts) if len(parts) > 1 else parts[0]).subquery()
+    return (
+        select(counts.c.student_id, cast(func.sum(counts.c.attended), db.Integer).label('attended'))
+        .group_by(counts.c.student_id)
+        .subquery()
     )
-    # Apply date filters
-    if start_date:
-        attendance_query = attendance_query.filter(Attendance.class_date >= start_date)
-    if end_date:
-        attendance_query = attendance_query.filter(Attendance.class_date <= end_date)
-
-    # Get total distinct classes in date range
-    total_classes = attendance_query.with_entities(Attendance.class_date).distinct().count()
-
-    # Calculate attendance for each student
-    low_attendance = []
-    for student in course.students:
-        # Get student's attendance count within date range
-        attended = attendance_query.filter(
-            Attendance.student_id == student._id
-        ).count()
-
-        # Calculate percentage
-        percentage = (attended / total_classes * 100) if total_classes > 0 else 0
-        
-        if percentage < 75:
-            low_attendance.append({
-                'student_name': student.name,
-                'student_roll_no': student.roll_no,
-                'attendance_percentage': round(percentage, 2)
-            })
+
+def _student_range_attended(student_id, start_date=None, end_date=None):
+    """Scalar subquery for the classes one student attended in a date range"""
+    days, edges = _split_date_range(start_date, end_date)
+    parts = []
+
+    if days is not None:
+        parts.append(
+            db.session.query(func.coalesce(func.sum(StudentDailyRollup.attended), 0))
+            .filter(StudentDailyRollup.student_id == student_id, *_day_conditions(StudentDailyRollup.day, days))
+            .scalar_subquery()
+        )
+    for edge in edges:
+        parts.append(
+            db.session.query(func.count(Attendance.id))
+            .filter(Attendance.student_id == student_id, *_edge_conditions(Attendance.class_date, edge))
+            .scalar_subquery()
+        )
+    return sum(parts[1:], parts[0])
+
+def get_course_attendance_counts(course_code, start_date=None, end_date=None):
+    """Get attended class counts for every student in a course plus the total
+    number of classes, using a single grouped query or the in-memory index.
+    Students are (student_id, name, roll_no, attended, total_classes) tuples in
+    roll number order."""
+    index = _course_index(course_code)
+    if index is not None:
+        rows = index.student_counts(_to_utc_naive(start_date), _to_utc_naive(end_date))
+    elif start_date or end_date:
+        # Sessions and per-student counts come from the daily rollups, evaluated
+        # inside the same statement
+        total_classes_subquery, _ = _course_range_totals(course_code, start_date, end_date, attendance=False)
+        counts = _student_range_counts(course_code, start_date, end_date)
+
+        # LEFT JOIN so students without any attendance still show up with 0
+        rows = (
+            db.session.query(
+                Student._id,
+                Student.name,
+                Student.roll_no,
+                func.coalesce(counts.c.attended, 0),
+                total_classes_subquery
+            )
+            .outerjoin(counts, counts.c.student_id == Student._id)
+            .filter(Student.course_code == course_code)
+            .order_by(Student.roll_no)
+            .all()
+        )
+    else:
+        # Undated counts are one summary row per student, no attendance scan
+        rows = (
+            db.session.query(
+                Student._id,
+                Student.name,
+                Student.roll_no,
+                func.coalesce(AttendanceSummary.attended_count, 0),
+                func.coalesce(_course_total_classes_subquery(course_code), 0)
+            )
+            .outerjoin(AttendanceSummary, AttendanceSummary.student_id == Student._id)
+            .filter(Student.course_code == course_code)
+            .order_by(Student.roll_no)
+            .all()
+        )
+
+    total_classes = rows[0][4] if rows else 0
+    return total_classes, rows
+
+def _attendance_percentage(attended, total_classes):
+    return (attended / total_classes * 100) if total_classes > 0 else 0
+
+LOW_ATTENDANCE_DENOMINATORS = ('classes', 'eligible')
+LOW_ATTENDANCE_ORDER = {
+    'roll_no': [('roll_no', False)],
+    'percentage': [('percentage', False), ('roll_no', False)],
+    '-percentage': [('percentage', True), ('roll_no', False)],
+}
+
+# fetch students below an attendance threshold
+@stats_cache.cached('low_attendance')
+def get_low_attendance_students(course_code, start_date=None, end_date=None, threshold=75,
+                                denominator='classes', sort='roll_no', limit=None, offset=0):
+    """Return students whose attendance percentage is below threshold in a course.
+
+    denominator 'classes' divides by every class in the range, 'eligible' only by
+    the classes held since the student enrolled. Offending students are ranked
+    from the lowest percentage, sorted by sort and paginated with limit/offset.
+    """
+    if denominator not in LOW_ATTENDANCE_DENOMINATORS:
+        raise ValueError(f"denominator must be one of {', '.join(LOW_ATTENDANCE_DENOMINATORS)}")
+    if sort not in LOW_ATTENDANCE_ORDER:
+        raise ValueError(f"sort must be one of {', '.join(LOW_ATTENDANCE_ORDER)}")
+
+    index = _course_index(course_code)
+    if index is not None:
+        totals, page = _low_attendance_from_index(
+            index, start_date, end_date, threshold, denominator, sort, limit, offset
+        )
+    else:
+        totals, page = _low_attendance_from_db(
+            course_code, start_date, end_date, threshold, denominator, sort, limit, offset
+        )
+    if totals is None:
+        raise ValueError(f"Course {course_code} not found")
+    total_classes, total_students, total_low_attendance = totals
 
     return {
         'course_code': course_code,
         'total_classes': total_classes,
-        'students_with_low_attendance': low_attendance,
-        'total_students': len(course.students),
+        'threshold': threshold,
+        'denominator': denominator,
+        'students_with_low_attendance': [
+            {
+                'student_name': name,
+                'student_roll_no': roll_no,
+                'attended_classes': attended,
+                'eligible_classes': eligible,
+                'attendance_percentage': round(_attendance_percentage(attended, eligible), 2),
+                'rank': rank
+            }
+            for name, roll_no, attended, eligible, rank in page
+        ],
+        'total_low_attendance': total_low_attendance,
+        'total_students': total_students,
         'start_date': start_date.isoformat() if start_date else None,
         'end_date': end_date.isoformat() if end_date else None
     }
-    
-# Get attendance percentage of every student in a course
-def get_course_attendance_percentage(course_code, start_date=None, end_date=None):
-    """Get attendance percentage of every student in a course"""
-    # Base query for attendance records
-    query = Attendance.query.filter(Attendance.student_id.in_([s._id for s in Teacher.query.get(course_code).students]))
-    
-    # Apply date filters if provided
-    if start_date:
-        query = query.filter(Attendance.class_date >= start_date)
-    if end_date:
-        query = query.filter(Attendance.class_date <= end_date)
-    
-    # Get total classes in the date range
-    total_classes = query.distinct(Attendance.class_date).count()
-    
-    # Get Total students
-    total_students = len(Teacher.query.get(course_code).students)
-    
-    # Get attended classes
-    attended_classes = query.count()
-    
-    # Calculate actual possible attendance (accounting for students who joined later)
-    total_possible_attendance = 0
-    for student in Teacher.query.get(course_code).students:
-        student_attendance = Attendance.query.filter(
-            Attendance.student_id == student._id,
-            Attendance.class_date >= (start_date or datetime.min.replace(tzinfo=timezone.utc)),
-            Attendance.class_date <= (end_date or datetime.max.replace(tzinfo=timezone.utc))
-        ).count()
-        total_possible_attendance += student_attendance
-    
-    attendance_percentage = (attended_classes / total_possible_attendance * 100) if total_possible_attendance > 0 else 0
-    
+
+def _low_attendance_from_db(course_code, start_date, end_date, threshold, denominator, sort, limit, offset):
+    """One statement returning the course totals and one page of offending students.
+
+    Per-student counts are grouped and filtered with HAVING, so only offending
+    students leave the database. rank() orders them by percentage, and the
+    totals row is left joined to the page so it comes back even when the page
+    is empty.
+    """
+    query = select(Student._id, Student.name, Student.roll_no).where(Student.course_code == course_code)
+    if start_date or end_date:
+        total_classes, _ = _course_range_totals(course_code, start_date, end_date, attendance=False)
+        counts = _student_range_counts(course_code, start_date, end_date)
+        query = query.outerjoin(counts, counts.c.student_id == Student._id)
+        attended_count = counts.c.attended
+    else:
+        total_classes = _course_total_classes_subquery(course_code)
+        query = query.outerjoin(AttendanceSummary, AttendanceSummary.student_id == Student._id)
+        attended_count = AttendanceSummary.attended_count
+    attended = func.coalesce(attended_count, 0)
+
+    if denominator == 'eligible':
+        # Count only the sessions held after the student enrolled
+        sessions = (
+            _course_sessions_query(course_code, start_date, end_date)
+            .with_entities(ClassSession.started_at)
+            .subquery()
+        )
+        query = query.outerjoin(sessions, or_(
+            Student.enrolled_at.is_(None),
+            sessions.c.started_at >= Student.enrolled_at
+        ))
+        eligible = func.count(sessions.c.started_at)
+    else:
+        eligible = func.coalesce(total_classes, 0)
+
+    percentage = case((eligible > 0, cast(attended, db.Numeric) * 100 / eligible), else_=0)
+    below = attended * 100 < eligible * threshold
+    offenders = (
+        query.add_columns(
+            attended.label('attended'),
+            eligible.label('eligible'),
+            percentage.label('percentage'),
+            func.rank().over(order_by=percentage).label('rank')
+        )
+        .group_by(Student._id, Student.name, Student.roll_no, attended_count)
+        .having(or_(eligible == 0, below) if threshold > 0 else below)
+        .cte('offenders')
+    )
+
+    def ordering(columns):
+        return [columns[name].desc() if descending else columns[name] for name, descending in LOW_ATTENDANCE_ORDER[sort]]
+
+    page = select(offenders).order_by(*ordering(offenders.c)).offset(offset)
+    if limit is not None:
+        page = page.limit(limit)
+    page = page.subquery()
+
+    totals = select(
+        select(Teacher.course_code).where(Teacher.course_code == course_code).scalar_subquery().label('course_code'),
+        func.coalesce(total_classes, 0).label('total_classes'),
+        select(func.count(Student._id)).where(Student.course_code == course_code).scalar_subquery().label('total_students'),
+        select(func.count()).select_from(offenders).scalar_subquery().label('total_low_attendance')
+    ).subquery()
+
+    rows = db.session.execute(
+        select(totals, page.c.name, page.c.roll_no, page.c.attended, page.c.eligible, page.c.rank)
+        .select_from(totals.outerjoin(page, true()))
+        .order_by(*ordering(page.c))
+    ).all()
+
+    if rows[0].course_code is None:
+        return None, []
+    totals = (rows[0].total_classes, rows[0].total_students, rows[0].total_low_attendance)
+    page = [(row.name, row.roll_no, row.attended, row.eligible, row.rank) for row in rows if row.roll_no is not None]
+    return totals, page
+
+def _low_attendance_from_index(index, start_date, end_date, threshold, denominator, sort, limit, offset):
+    """Same result as _low_attendance_from_db, computed from the in-memory index"""
+    start, end = _to_utc_naive(start_date), _to_utc_naive(end_date)
+    students = index.student_counts(start, end, eligible=denominator == 'eligible')
+    # Index rows are already in roll number order, keep that position as the roll_no sort key
+    offenders = [
+        (name, roll_no, attended, eligible, Fraction(attended * 100, eligible) if eligible else 0, position)
+        for position, (_, name, roll_no, attended, eligible) in enumerate(students)
+        if (eligible == 0 and threshold > 0) or attended * 100 < eligible * threshold
+    ]
+
+    percentages = sorted(offender[4] for offender in offenders)
+    for column, descending in reversed(LOW_ATTENDANCE_ORDER[sort]):
+        key = 4 if column == 'percentage' else 5
+        offenders.sort(key=lambda offender: offender[key], reverse=descending)
+
+    page_end = offset + limit if limit is not None else None
+    page = [
+        (name, roll_no, attended, eligible, bisect_left(percentages, percentage) + 1)
+        for name, roll_no, attended, eligible, percentage, _ in offenders[offset:page_end]
+    ]
+    total_classes = index.range_mask(start, end)[1]
+    return (total_classes, len(students), len(offenders)), page
+
+@stats_cache.cached('students_percentage')
+def get_students_attendance_percentage(course_code, start_date=None, end_date=None):
+    """Get attendance percentage and attended classes of every student in a course"""
+    total_classes, students = get_course_attendance_counts(course_code, start_date, end_date)
+
+    student_stats = [
+        {
+            'student_name': name,
+            'roll_no': roll_no,
+            'attendance_percentage': round(_attendance_percentage(attended, total_classes), 2),
+            'attended_classes': attended,
+        }
+        for _, name, roll_no, attended, _ in students
+    ]
+
     return {
         'course_code': course_code,
-        'total_classes': total_classes,
-        'attended_classes': attended_classes,
-        'attendance_percentage': round(attendance_percentage, 2),
+        'total_students': len(students),
         'start_date': start_date.isoformat() if start_date else None,
         'end_date': end_date.isoformat() if end_date else None,
-        'total_students': total_students
+        'students': student_stats,
+        'total_classes': total_classes
     }
+    
+def get_course_attendance_percentage(course_code, start_date=None, end_date=None):
+    """Get the overall attendance percentage of a course"""
+    return get_course_attendance_stats(course_code, start_date, end_date)
 
 def add_ta_to_course(course_code, ta_email):
     """Add a TA to a course"""
@@ -258,6 +1413,7 @@ def add_ta_to_course(course_code, ta_email):
     if ta_email in course.TA:
         raise ValueError(f"TA {ta_email} already exists for course {course_code}")
     course.TA = course.TA + [ta_email]
+    Teacher.bump_version(course_code)
     db.session.commit()
     return course.json()
 
@@ -269,5 +1425,6 @@ def remove_ta_from_course(course_code, ta_email):
     if ta_email not in course.TA:
         raise ValueError(f"TA {ta_email} not found in course {course_code}")
     course.TA = [email for email in course.TA if email != ta_email]
+    Teacher.bump_version(course_code)
     db.session.commit()
     return course.json()
\ No newline at end of file
@@ -0,0 +1,15 @@
+import os
+
+_TRUE = ('1', 'true', 'yes', 'on')
+_FALSE = ('0', 'false', 'no', 'off')
+
+
+def env_flag(name, default):
+    """Boolean environment variable: 1/true/yes/on or 0/false/no/off, the default
+    when it is unset or anything else"""
+    value = os.environ.get(name, '').strip().lower()
+    if value in _TRUE:
+        return True
+    if value in _FALSE:
+        return False
+    return default
@@ -0,0 +1,74 @@
+import os
+import uuid
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import delete, event
+
+
+@pytest.fixture(scope='session')
+def app():
+    """The app on DATABASE_URL, upgraded to the latest migration. Skips every
+    test using it when DATABASE_URL is not set."""
+    if not os.environ.get('DATABASE_URL'):
+        pytest.skip('DATABASE_URL is not set, these tests need a PostgreSQL database')
+    # Every call has to reach the database, and nothing runs in the background
+    os.environ['STATS_CACHE_BACKEND'] = 'none'
+    os.environ['ATTENDANCE_INDEX_MAX_MB'] = '0'
+    os.environ['ATTENDANCE_INGEST_WORKER'] = '0'
+
+    from flask_migrate import upgrade
+    from app import create_app
+    app = create_app()
+    with app.app_context():
+        upgrade()
+    return app
+
+
+@pytest.fixture
+def app_context(app):
+    with app.app_context():
+        yield
+
+
+@pytest.fixture
+def make_course(app):
+    """Create a course with a unique code, deleted with everything in it after the test"""
+    from models import db, Teacher
+    codes = []
+
+    def make(teachers=(), tas=()):
+        code = 'T' + uuid.uuid4().hex[:9]
+        with app.app_context():
+            db.session.add(Teacher(code, list(teachers), list(tas)))
+            db.session.commit()
+        codes.append(code)
+        return code
+
+    yield make
+    with app.app_context():
+        db.session.execute(delete(Teacher).where(Teacher.course_code.in_(codes)))
+        db.session.commit()
+
+
+@pytest.fixture
+def record_queries(app):
+    """Context manager collecting the (statement, parameters) of the SQL run inside it"""
+    from models import db
+
+    @contextmanager
+    def record():
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            statements.append((statement, parameters))
+
+        with app.app_context():
+            engine = db.engine
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            yield statements
+        finally:
+            event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+    return record
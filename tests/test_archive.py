@@ -0,0 +1,52 @@
+from datetime import datetime, timezone
+
+import pytest
+
+import services
+from models import db, Student, Teacher
+
+# Far enough back that no other test writes to this month's partition
+ARCHIVED_MONTH = datetime(2001, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def course(app_context, make_course):
+    """Two sessions in ARCHIVED_MONTH and one marked now"""
+    code = make_course(['teacher@example.com'])
+    for roll_no in 'ABC':
+        services.add_student_to_course(f'Student {roll_no}', roll_no, code)
+    Student.query.filter_by(course_code=code).update({'enrolled_at': datetime(2000, 12, 1)})
+    db.session.commit()
+
+    sessions = [
+        (ARCHIVED_MONTH.replace(day=10), ['A', 'B']),
+        (ARCHIVED_MONTH.replace(day=17), ['A', 'C']),
+    ]
+    services.attendance_partitions.ensure(db.engine, [held_at for held_at, _ in sessions])
+    services._write_class_sessions(code, sessions)
+    db.session.commit()
+    services.mark_attendance(code, ['B'])
+    return code
+
+
+def course_reads(code):
+    january = (ARCHIVED_MONTH, ARCHIVED_MONTH.replace(day=31))
+    return [
+        services.get_course_attendance_stats(code),
+        services.get_course_attendance_stats(code, *january),
+        services.get_students_attendance_percentage(code),
+        services.get_students_attendance_percentage(code, *january),
+    ]
+
+
+def test_archiving_keeps_stats_and_bumps_the_version(course):
+    reads = course_reads(course)
+    assert reads[0]['total_classes'] == 3
+    version = db.session.get(Teacher, course).version
+
+    # The reads above left the session's transaction open on attendance
+    archived = services.archive_attendance(datetime(2001, 2, 1), drop=True)
+
+    assert archived == ['attendance_y2001m01']
+    assert db.session.get(Teacher, course).version > version
+    assert course_reads(course) == reads
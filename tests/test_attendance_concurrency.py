@@ -0,0 +1,28 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import services
+from models import db, ClassSession, Teacher
+
+REQUESTS = 24
+THREADS = 8
+
+
+def test_parallel_attendance_posts_are_all_counted(app, make_course):
+    code = make_course(['teacher@example.com'])
+    with app.app_context():
+        services.add_student_to_course('Student A', 'A', code)
+
+    client = app.test_client()
+
+    def post(_):
+        response = client.post('/api/teacher/attendance', json={'course_code': code, 'roll_numbers': ['A']})
+        return response.status_code
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        statuses = list(pool.map(post, range(REQUESTS)))
+
+    assert statuses == [201] * REQUESTS
+    with app.app_context():
+        assert db.session.get(Teacher, code).total_classes == REQUESTS
+        assert ClassSession.query.filter_by(course_code=code).count() == REQUESTS
+        assert services.get_course_attendance_stats(code)['attended_classes'] == REQUESTS
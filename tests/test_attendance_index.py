@@ -0,0 +1,116 @@
+from datetime import timedelta, timezone
+
+import pytest
+
+import services
+from models import db, ClassSession, Student
+
+INDIA = timezone(timedelta(hours=5, minutes=30))
+
+
+@pytest.fixture
+def index(app_context):
+    services.attendance_index.configure(64 * 1024 * 1024)
+    yield services.attendance_index
+    services.attendance_index.configure(0)
+
+
+@pytest.fixture
+def course(app_context, make_course):
+    """Four sessions with uneven attendance. C enrolled after the first session
+    and D after the third, E never attended."""
+    code = make_course(['teacher@example.com'])
+    for roll_no in 'ABCDE':
+        services.add_student_to_course(f'Student {roll_no}', roll_no, code)
+    for roll_numbers in (['A', 'B'], ['A', 'C'], ['A', 'B', 'C'], ['B', 'D']):
+        services.mark_attendance(code, roll_numbers)
+
+    started = sessions_of(code)
+    for roll_no, after in (('C', 0), ('D', 2)):
+        (Student.query
+            .filter_by(course_code=code, roll_no=roll_no)
+            .update({'enrolled_at': started[after] + (started[after + 1] - started[after]) / 2}))
+    db.session.commit()
+    return code
+
+
+def sessions_of(code):
+    return [
+        started_at for (started_at,) in
+        db.session.query(ClassSession.started_at).filter_by(course_code=code).order_by(ClassSession.started_at)
+    ]
+
+
+def date_ranges(code):
+    started = sessions_of(code)
+    middle = started[1] + (started[2] - started[1]) / 2
+    return [
+        (None, None),
+        (started[1], None),
+        (None, started[2]),
+        (started[1], started[2]),
+        (middle, None),
+        (started[-1], started[-1]),
+        (started[1].replace(tzinfo=timezone.utc).astimezone(INDIA), None),
+    ]
+
+
+def course_reads(code):
+    return [
+        (
+            services.get_course_attendance_stats(code, start, end),
+            services.get_students_attendance_percentage(code, start, end),
+        )
+        for start, end in date_ranges(code)
+    ]
+
+
+def sql_reads(index, code):
+    """course_reads with the index switched off, leaving the courses it holds alone"""
+    max_bytes, index.max_bytes = index.max_bytes, 0
+    try:
+        return course_reads(code)
+    finally:
+        index.max_bytes = max_bytes
+
+
+def test_index_answers_like_sql(index, course):
+    loads = index.loads
+    assert course_reads(course) == sql_reads(index, course)
+    assert index.loads == loads + 1
+
+
+def test_index_follows_writes_between_reads(index, course, monkeypatch):
+    course_reads(course)
+    loads = index.loads
+
+    # A session marked by this process is appended to the loaded index
+    services.mark_attendance(course, ['A', 'E'])
+    assert course_reads(course) == sql_reads(index, course)
+    assert index.loads == loads
+
+    # One marked by another process only moves the version, which the next read notices
+    with monkeypatch.context() as patch:
+        patch.setattr(index, 'record_sessions', lambda *args: None)
+        services.mark_attendance(course, ['C', 'D', 'E'])
+    assert course_reads(course) == sql_reads(index, course)
+    assert index.loads == loads + 1
+
+
+@pytest.mark.parametrize('sort', sorted(services.LOW_ATTENDANCE_ORDER))
+@pytest.mark.parametrize('denominator', services.LOW_ATTENDANCE_DENOMINATORS)
+def test_low_attendance_from_index_matches_the_database(index, course, denominator, sort):
+    course_index = services._course_index(course)
+    ranks = []
+    for start, end in date_ranges(course)[:4]:
+        # 2 of 3 classes is 66.67%, just below 66.7 but above 66.66
+        for threshold in (0, 66.66, 66.7, 100):
+            for limit, offset in ((None, 0), (2, 1), (1, 10)):
+                arguments = (start, end, threshold, denominator, sort, limit, offset)
+                from_db = services._low_attendance_from_db(course, *arguments)
+                assert services._low_attendance_from_index(course_index, *arguments) == from_db, arguments
+                ranks.append([rank for *_, rank in from_db[1]])
+
+    # Ties share a rank, and some pages start past the first offender
+    assert any(len(set(page)) < len(page) for page in ranks)
+    assert any(page and page[0] > 1 for page in ranks)
@@ -0,0 +1,79 @@
+import services
+from models import db, AttendanceTicket, ClassSession, Teacher
+
+
+def post_async(client, code, roll_numbers, idempotency_key=None):
+    headers = {'Idempotency-Key': idempotency_key} if idempotency_key else {}
+    return client.post(
+        '/api/teacher/attendance',
+        json={'course_code': code, 'roll_numbers': roll_numbers, 'async': True},
+        headers=headers
+    )
+
+
+def test_a_retried_batch_is_written_once(app, make_course):
+    code = make_course(['teacher@example.com'])
+    with app.app_context():
+        services.add_student_to_course('Student A', 'A', code)
+        services.add_student_to_course('Student B', 'B', code)
+    client = app.test_client()
+    worker = app.extensions['attendance_ingest']
+
+    first = post_async(client, code, ['A', 'B', 'Z'], 'retry-me')
+    retry = post_async(client, code, ['A', 'B', 'Z'], 'retry-me')
+    assert (first.status_code, retry.status_code) == (202, 202)
+    assert retry.json['ticket_id'] == first.json['ticket_id']
+    assert retry.json['status'] == 'pending'
+    assert first.headers['Location'].endswith(first.json['ticket_id'])
+
+    assert worker.run_once() >= 1
+    ticket = client.get(first.headers['Location']).json
+    assert ticket['status'] == 'applied'
+    assert ticket['marked'] == 2
+    assert ticket['unknown_roll_numbers'] == ['Z']
+    assert ticket['session_id'] is not None
+    assert ticket['applied_at'] is not None
+
+    # A retry after the batch was applied still gets the same ticket back
+    late = post_async(client, code, ['A', 'B', 'Z'], 'retry-me')
+    assert late.json == ticket
+    worker.run_once()
+
+    with app.app_context():
+        assert AttendanceTicket.query.filter_by(course_code=code).count() == 1
+        assert ClassSession.query.filter_by(course_code=code).count() == 1
+        assert db.session.get(Teacher, code).total_classes == 1
+        assert services.get_course_attendance_stats(code)['attended_classes'] == 2
+
+
+def test_a_failed_course_does_not_hold_back_the_others(app, make_course):
+    broken, healthy = make_course(['teacher@example.com']), make_course(['teacher@example.com'])
+    with app.app_context():
+        services.add_student_to_course('Student A', 'A', broken)
+        services.add_student_to_course('Student A', 'A', healthy)
+    client = app.test_client()
+
+    failing = post_async(client, broken, ['A']).json
+    applied = post_async(client, healthy, ['A']).json
+    # A session already held at the ticket's time makes its write fail
+    with app.app_context():
+        ticket = db.session.get(AttendanceTicket, failing['ticket_id'])
+        db.session.add(ClassSession(broken, started_at=ticket.created_at))
+        db.session.commit()
+
+    app.extensions['attendance_ingest'].run_once()
+
+    failing = client.get(f"/api/teacher/attendance/tickets/{failing['ticket_id']}").json
+    assert failing['status'] == 'failed'
+    assert 'uix_course_session' in failing['error']
+    assert failing['applied_at'] is not None
+    assert (failing['session_id'], failing['marked']) == (None, None)
+
+    applied = client.get(f"/api/teacher/attendance/tickets/{applied['ticket_id']}").json
+    assert (applied['status'], applied['marked']) == ('applied', 1)
+
+    with app.app_context():
+        # The failed write left no trace of its own
+        assert db.session.get(Teacher, broken).total_classes == 0
+        assert ClassSession.query.filter_by(course_code=broken).count() == 1
+        assert db.session.get(Teacher, healthy).total_classes == 1
@@ -0,0 +1,93 @@
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response, jsonify
+
+import compression
+
+ROWS = [{'roll_no': f'R{number:04d}', 'name': f'Student {number}', 'attended_classes': number % 40} for number in range(200)]
+
+
+@pytest.fixture
+def client(monkeypatch):
+    for name in ('RESPONSE_COMPRESSION', 'COMPRESSION_MIN_BYTES', 'GZIP_LEVEL'):
+        monkeypatch.delenv(name, raising=False)
+    app = Flask(__name__)
+
+    @app.route('/large')
+    def large():
+        return jsonify(ROWS)
+
+    @app.route('/small')
+    def small():
+        return jsonify(ROWS[0])
+
+    @app.route('/stream')
+    def stream():
+        return Response((json.dumps(row) + '\n' for row in ROWS), mimetype='application/x-ndjson')
+
+    @app.route('/binary')
+    def binary():
+        return Response(b'\x00' * 4096, mimetype='application/octet-stream')
+
+    @app.route('/not-modified')
+    def not_modified():
+        return Response(status=304, mimetype='application/json')
+
+    compression.init_compression(app)
+    return app.test_client()
+
+
+def test_gzip_round_trip(client):
+    plain = client.get('/large')
+    compressed = client.get('/large', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in plain.headers
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Accept-Encoding' in plain.vary
+    assert 'Accept-Encoding' in compressed.vary
+    assert int(compressed.headers['Content-Length']) == len(compressed.data) < len(plain.data)
+    assert gzip.decompress(compressed.data) == plain.data
+
+
+def test_streamed_bodies_are_compressed_as_they_go(client):
+    plain = client.get('/stream')
+    compressed = client.get('/stream', headers={'Accept-Encoding': 'gzip'})
+
+    assert compressed.headers['Content-Encoding'] == 'gzip'
+    assert 'Content-Length' not in compressed.headers
+    assert 'Accept-Encoding' in compressed.vary
+    assert gzip.decompress(compressed.data) == plain.data
+
+
+@pytest.mark.parametrize('path', ['/small', '/not-modified'])
+def test_vary_without_compression(client, path):
+    response = client.get(path, headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' in response.vary
+
+
+def test_binary_bodies_are_left_alone(client):
+    response = client.get('/binary', headers={'Accept-Encoding': 'gzip'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert 'Accept-Encoding' not in response.vary
+    assert response.data == b'\x00' * 4096
+
+
+def test_unaccepted_encodings_are_not_used(client):
+    response = client.get('/large', headers={'Accept-Encoding': 'gzip;q=0, identity'})
+
+    assert 'Content-Encoding' not in response.headers
+    assert json.loads(response.data) == ROWS
+
+
+def test_brotli_round_trip(client):
+    brotli = pytest.importorskip('brotli')
+    plain = client.get('/large')
+    compressed = client.get('/large', headers={'Accept-Encoding': 'gzip, br'})
+
+    assert compressed.headers['Content-Encoding'] == 'br'
+    assert brotli.decompress(compressed.data) == plain.data
@@ -0,0 +1,65 @@
+import pytest
+
+import services
+
+
+@pytest.fixture
+def course(app, make_course):
+    code = make_course(['teacher@example.com'], ['ta@example.com'])
+    with app.app_context():
+        services.add_student_to_course('Student A', 'A', code)
+        services.mark_attendance(code, ['A'])
+    return code
+
+
+def test_matching_etag_gets_a_304_without_computing_stats(app, course, record_queries):
+    client = app.test_client()
+    path = f'/api/teacher/attendance/stats/course/{course}'
+    first = client.get(path)
+    assert first.status_code == 200
+    assert first.headers['ETag'].startswith('W/"')
+    assert first.cache_control.private and first.cache_control.no_cache
+
+    with record_queries() as queries:
+        second = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 304
+    assert second.data == b''
+    assert second.headers['ETag'] == first.headers['ETag']
+    # Only the version stamp lookup
+    assert len(queries) == 1
+
+
+def test_a_write_changes_the_etag(app, course):
+    client = app.test_client()
+    path = f'/api/teacher/attendance/stats/course/{course}'
+    first = client.get(path)
+
+    marked = client.post('/api/teacher/attendance', json={'course_code': course, 'roll_numbers': ['A']})
+    assert marked.status_code == 201
+
+    second = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
+    assert (first.json['total_classes'], second.json['total_classes']) == (1, 2)
+    assert client.get(path, headers={'If-None-Match': second.headers['ETag']}).status_code == 304
+
+
+@pytest.mark.parametrize('email', ['ta@example.com', 'teacher@example.com'])
+def test_removing_a_ta_changes_the_course_list_etag(app, course, email):
+    client = app.test_client()
+    path = f'/api/teacher/courses?email={email}'
+    first = client.get(path)
+    assert first.status_code == 200
+    assert client.get(path, headers={'If-None-Match': first.headers['ETag']}).status_code == 304
+
+    removed = client.delete(f'/api/teacher/courses/{course}/ta', json={'ta_email': 'ta@example.com'})
+    assert removed.status_code == 200
+
+    second = client.get(path, headers={'If-None-Match': first.headers['ETag']})
+    assert second.status_code == 200
+    assert second.headers['ETag'] != first.headers['ETag']
+    courses = {entry['course_code']: entry for entry in second.json}
+    if email == 'ta@example.com':
+        assert course not in courses
+    else:
+        assert courses[course]['TA'] == []
@@ -0,0 +1,71 @@
+import pytest
+
+import services
+from models import db, ClassSession, Student
+
+
+@pytest.fixture
+def course(app_context, make_course):
+    """Three sessions. A and B enrolled before the first one, C only between
+    the first and the second, so the first does not count towards C's
+    possible attendance."""
+    code = make_course(['teacher@example.com'])
+    for roll_no in ('A', 'B', 'C'):
+        services.add_student_to_course(f'Student {roll_no}', roll_no, code)
+    services.mark_attendance(code, ['A'])
+    services.mark_attendance(code, ['A', 'B', 'C'])
+    services.mark_attendance(code, ['C'])
+
+    started = [
+        started_at for (started_at,) in
+        db.session.query(ClassSession.started_at).filter_by(course_code=code).order_by(ClassSession.started_at)
+    ]
+    (Student.query
+        .filter_by(course_code=code, roll_no='C')
+        .update({'enrolled_at': started[0] + (started[1] - started[0]) / 2}))
+    db.session.commit()
+    return code, started
+
+
+def test_possible_attendance_counts_sessions_since_enrollment(course):
+    code, _ = course
+
+    stats = services.get_course_attendance_stats(code)
+
+    assert stats['total_classes'] == 3
+    assert stats['total_students'] == 3
+    assert stats['attended_classes'] == 5
+    # A and B could attend 3 classes each, C only 2
+    assert stats['attendance_percentage'] == round(5 / 8 * 100, 2)
+    assert services.get_course_attendance_percentage(code) == stats
+
+
+def test_possible_attendance_in_a_date_range(course):
+    code, started = course
+
+    stats = services.get_course_attendance_stats(code, start_date=started[1])
+
+    assert stats['total_classes'] == 2
+    assert stats['attended_classes'] == 4
+    assert stats['attendance_percentage'] == round(4 / 6 * 100, 2)
+
+
+@pytest.mark.parametrize('ranged', [False, True])
+def test_query_count_does_not_grow_with_the_roster(course, record_queries, ranged):
+    code, started = course
+    start_date = started[1] if ranged else None
+
+    with record_queries() as small:
+        services.get_course_attendance_stats(code, start_date=start_date)
+    for number in range(20):
+        services.add_student_to_course(f'Student {number}', f'R{number}', code)
+    services.mark_attendance(code, [f'R{number}' for number in range(0, 20, 2)])
+    with record_queries() as large:
+        services.get_course_attendance_stats(code, start_date=start_date)
+
+    assert len(small) == len(large) == 2
+
+
+def test_unknown_course(app_context):
+    with pytest.raises(ValueError):
+        services.get_course_attendance_stats('NOPE')
@@ -0,0 +1,79 @@
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import text
+
+import services
+from models import db, ClassSession
+from services import _split_date_range
+
+INDIA = timezone(timedelta(hours=5, minutes=30))
+
+
+def at(day, hour=0, minute=0, tzinfo=None):
+    return datetime(2024, 3, day, hour, minute, tzinfo=tzinfo)
+
+
+def day_end(day):
+    return datetime.combine(date(2024, 3, day), datetime.max.time())
+
+
+@pytest.mark.parametrize('start, end, expected', [
+    # Open on both sides, everything comes from the rollups
+    (None, None, ((None, None), [])),
+    (at(1), day_end(3), ((date(2024, 3, 1), date(2024, 3, 3)), [])),
+    # Inside one day there is no whole day, the range is answered from raw rows
+    (at(5, 9), at(5, 17), (None, [(at(5, 9), at(5, 17), True)])),
+    (at(5, 17), at(5, 9), (None, [(at(5, 17), at(5, 9), True)])),
+    # Midnight opens a whole day at the start, but an end at midnight only
+    # includes the instant itself of that day
+    (at(1), at(2), ((date(2024, 3, 1), date(2024, 3, 1)), [(at(2), at(2), True)])),
+    (at(1, 10, 30), at(3), (
+        (date(2024, 3, 2), date(2024, 3, 2)),
+        [(at(1, 10, 30), at(2), False), (at(3), at(3), True)],
+    )),
+    (at(1, 10, 30), at(2), (None, [(at(1, 10, 30), at(2), True)])),
+    # Open on one side
+    (at(1, 10, 30), None, ((date(2024, 3, 2), None), [(at(1, 10, 30), at(2), False)])),
+    (None, at(3, 12), ((None, date(2024, 3, 2)), [(at(3), at(3, 12), True)])),
+    (None, day_end(3), ((None, date(2024, 3, 3)), [])),
+], ids=[
+    'open', 'whole_days', 'same_day', 'reversed_same_day', 'end_at_midnight',
+    'partial_days_at_both_ends', 'partial_day_to_midnight', 'open_end', 'open_start', 'open_start_whole_day',
+])
+def test_split_date_range(start, end, expected):
+    assert _split_date_range(start, end) == expected
+
+
+def test_aware_bounds_are_split_on_utc_days():
+    # 05:30 in India is UTC midnight, 15:00 is 09:30 UTC
+    days, edges = _split_date_range(at(1, 5, 30, INDIA), at(3, 15, tzinfo=INDIA))
+
+    assert days == (date(2024, 3, 1), date(2024, 3, 2))
+    assert edges == [(at(3), at(3, 9, 30), True)]
+    assert _split_date_range(at(1, 5, 30, INDIA), at(3, 15, tzinfo=INDIA)) == \
+        _split_date_range(at(1), at(3, 9, 30))
+
+
+def test_aware_bounds_do_not_depend_on_the_database_time_zone(app_context, make_course):
+    code = make_course(['teacher@example.com'])
+    for roll_no in ('A', 'B'):
+        services.add_student_to_course(f'Student {roll_no}', roll_no, code)
+    services.mark_attendance(code, ['A'])
+    services.mark_attendance(code, ['A', 'B'])
+    services.mark_attendance(code, ['B'])
+    sessions = (
+        db.session.query(ClassSession.id, ClassSession.started_at)
+        .filter_by(course_code=code).order_by(ClassSession.started_at).all()
+    )
+    _, (session_id, started_at), _ = sessions
+    # The second session as a teacher in India would send it
+    moment = started_at.replace(tzinfo=timezone.utc).astimezone(INDIA)
+
+    db.session.execute(text("SET LOCAL TIME ZONE 'America/New_York'"))
+    try:
+        assert services.get_course_sessions(code, moment, moment) == [(session_id, started_at)]
+        stats = services.get_course_attendance_stats(code, moment, moment)
+        assert (stats['total_classes'], stats['attended_classes']) == (1, 2)
+    finally:
+        db.session.rollback()
@@ -0,0 +1,91 @@
+import random
+import uuid
+from dataclasses import dataclass
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+pytest.importorskip('orjson')
+from json_provider import FastJSONProvider  # noqa: E402
+
+
+@dataclass
+class Ticket:
+    ticket_id: str
+    marked: int
+
+
+FLOATS = [
+    0.0, -0.0, 0.1, 0.1 + 0.2, 33.33, 66.67, 100.0, -12.5, 123456789.125,
+    1e15, 123456789012345.6, 9999999999999998.0,
+    1e16, -1e16, 1.5e16, 12345678901234567.0, 1e17, 1e22, 1.7976931348623157e308,
+    1e-4, 1.5e-4, 9.99e-5, 2.5e-5, 1e-5, -1e-5, 1e-7, 1.5e-10, 5e-324,
+]
+
+PAYLOAD = {
+    'course_code': 'CS101',
+    'total_classes': 42,
+    'ints': [0, -1, 1, 2 ** 31, 2 ** 53 + 1, 2 ** 63 - 1, -2 ** 63],
+    'floats': FLOATS,
+    'attendance_percentage': 66.67,
+    'names': ['Zoë Ærø', 'Emoji \U0001F600 x', 'Line Sep', 'Del\x7fchar', 'Ctl\x01\x1f\t\n"\\/', 'plain'],
+    'dates': [
+        datetime(2025, 3, 4, 5, 6, 7),
+        datetime(2025, 3, 4, 5, 6, 7, 891011, tzinfo=timezone(timedelta(hours=5, minutes=30))),
+        date(2025, 3, 4),
+    ],
+    'start_date': None,
+    'flags': [True, False],
+    'id': uuid.UUID('975e6c0f-91a8-471c-9191-c36b3ce45daf'),
+    'decimal': Decimal('12.50'),
+    'ticket': Ticket('t-1', 3),
+    'nested': {'z': [{'b': [], 'a': {}}], 'a': [[1, [2.5, ['x']]], {'k': None}]},
+    # Strings that look like the floats the fast path hands back
+    'lookalikes': ['1e16', ':1e16,', '0.00001', ',0.0000', 'a975e6c0f'],
+    'tuple': (1, 'two'),
+}
+
+
+@pytest.fixture
+def app():
+    return Flask(__name__)
+
+
+def encode(app, provider_class, obj):
+    with app.app_context():
+        return provider_class(app).response(obj).get_data()
+
+
+@pytest.mark.parametrize('obj', [
+    PAYLOAD,
+    [PAYLOAD, PAYLOAD['nested']],
+    *FLOATS,
+    # Beyond 64 bits and non-string keys orjson refuses, the stdlib takes over
+    {'big': 2 ** 64},
+    {2: 'two', 1: 'one'},
+    'text',
+    None,
+], ids=repr)
+def test_same_bytes_as_flask_default_provider(app, obj):
+    assert encode(app, FastJSONProvider, obj) == encode(app, DefaultJSONProvider, obj)
+
+
+def test_same_bytes_for_floats_of_every_magnitude(app):
+    rng = random.Random(1234)
+    floats = [
+        rng.choice((-1, 1)) * rng.random() * 10 ** rng.randint(-30, 30)
+        for _ in range(5000)
+    ]
+    floats += [round(rng.random() * 100, 2) for _ in range(1000)]
+    assert encode(app, FastJSONProvider, floats) == encode(app, DefaultJSONProvider, floats)
+
+
+def test_plain_payloads_stay_on_the_fast_path(app):
+    provider = FastJSONProvider(app)
+    with app.app_context():
+        assert provider._dumps_bytes({'attendance_percentage': 66.67, 'id': '975e6c0f-1e16'}) is not None
+        assert provider._dumps_bytes({'value': 1e16}) is None
+        assert provider._dumps_bytes([1e-5]) is None
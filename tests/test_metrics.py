@@ -0,0 +1,70 @@
+import re
+
+from metrics import Counter, Histogram, Registry
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{[^}]*\})? (\S+)$')
+
+
+def parse_exposition(text):
+    """{sample name with labels: value}, checking every line is a HELP, a TYPE or
+    a sample of a metric whose TYPE came before it"""
+    assert text.endswith('\n')
+    samples = {}
+    types = {}
+    for line in text.splitlines():
+        if line.startswith('# HELP '):
+            continue
+        if line.startswith('# TYPE '):
+            name, kind = line[len('# TYPE '):].split(' ')
+            assert kind in ('counter', 'gauge', 'histogram')
+            types[name] = kind
+            continue
+        match = SAMPLE.match(line)
+        assert match, line
+        name = match.group(1)
+        base = re.sub(r'_(bucket|sum|count)$', '', name) if name not in types else name
+        assert base in types, line
+        samples[name + (match.group(2) or '')] = float(match.group(3))
+    return samples
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.register(Histogram('latency_seconds', 'Latency.', labels=('route',), buckets=(0.1, 1.0)))
+    latency.observe(0.05, route='/a')
+    latency.observe(0.5, route='/a')
+    latency.observe(5, route='/a')
+
+    samples = parse_exposition(registry.render())
+    assert samples['latency_seconds_bucket{route="/a",le="0.1"}'] == 1
+    assert samples['latency_seconds_bucket{route="/a",le="1.0"}'] == 2
+    assert samples['latency_seconds_bucket{route="/a",le="+Inf"}'] == 3
+    assert samples['latency_seconds_count{route="/a"}'] == 3
+    assert samples['latency_seconds_sum{route="/a"}'] == 5.55
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    counter = registry.register(Counter('things_total', 'Things.', labels=('name',)))
+    counter.inc(name='a "quoted"\\path\n')
+
+    assert 'things_total{name="a \\"quoted\\"\\\\path\\n"} 1\n' in registry.render()
+
+
+def test_scrape_counts_an_api_request(app, make_course):
+    code = make_course(['teacher@example.com'])
+    client = app.test_client()
+    key = 'http_requests_total{route="/api/teacher/courses/<course_code>/students",method="GET",status="200"}'
+
+    before = client.get('/metrics')
+    assert before.status_code == 200
+    assert before.mimetype == 'text/plain'
+    assert before.mimetype_params['version'] == '0.0.4'
+    count = parse_exposition(before.get_data(as_text=True)).get(key, 0)
+
+    assert client.get(f'/api/teacher/courses/{code}/students').status_code == 200
+
+    samples = parse_exposition(client.get('/metrics').get_data(as_text=True))
+    assert samples[key] == count + 1
+    assert samples['db_pool_checkouts_total'] >= 1
+    assert samples['process_resident_memory_bytes'] > 0
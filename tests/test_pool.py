@@ -0,0 +1,40 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+
+from pool import TimedQueuePool, pool_status
+
+
+def _engine(**options):
+    return create_engine('sqlite://', poolclass=TimedQueuePool, pool_size=1, max_overflow=0, **options)
+
+
+def test_each_engine_keeps_its_own_wait_stats():
+    first, second = _engine(), _engine()
+    for _ in range(3):
+        first.connect().close()
+    second.connect().close()
+
+    assert pool_status(first)['checkouts'] == 3
+    assert pool_status(second)['checkouts'] == 1
+    assert pool_status(second)['timeouts'] == 0
+
+
+def test_a_checkout_timeout_is_counted():
+    engine = _engine(pool_timeout=0.05)
+    with engine.connect():
+        with pytest.raises(PoolTimeoutError):
+            engine.connect()
+
+    status = pool_status(engine)
+    assert (status['checkouts'], status['timeouts']) == (2, 1)
+    assert status['max_wait_ms'] >= 50
+
+
+def test_wait_stats_survive_dispose():
+    engine = _engine()
+    engine.connect().close()
+    engine.dispose()
+    engine.connect().close()
+
+    assert pool_status(engine)['checkouts'] == 2
@@ -0,0 +1,24 @@
+import pytest
+
+from settings import env_flag
+
+
+@pytest.mark.parametrize('value, default, expected', [
+    (None, True, True),
+    (None, False, False),
+    ('', True, True),
+    ('1', False, True),
+    (' Yes ', False, True),
+    ('on', False, True),
+    ('0', True, False),
+    ('FALSE', True, False),
+    ('off', True, False),
+    ('maybe', True, True),
+    ('maybe', False, False),
+])
+def test_env_flag(monkeypatch, value, default, expected):
+    if value is None:
+        monkeypatch.delenv('TEST_FLAG', raising=False)
+    else:
+        monkeypatch.setenv('TEST_FLAG', value)
+    assert env_flag('TEST_FLAG', default) is expected
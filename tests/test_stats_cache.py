@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import update
+
+import services
+from cache import LRUCache
+from models import db, Teacher
+
+
+@pytest.fixture
+def stats_cache(app_context):
+    services.stats_cache.configure(LRUCache())
+    yield services.stats_cache
+    services.stats_cache.configure(None)
+
+
+def test_entries_are_skipped_after_a_write_from_another_process(stats_cache, make_course):
+    code = make_course(['teacher@example.com'])
+    services.add_student_to_course('Student A', 'A', code)
+    services.mark_attendance(code, ['A'])
+
+    hits, misses = stats_cache.hits, stats_cache.misses
+    first = services.get_course_attendance_stats(code)
+    assert services.get_course_attendance_stats(code) == first
+    assert (stats_cache.hits - hits, stats_cache.misses - misses) == (1, 1)
+
+    # What a write committed by another worker leaves behind, this process is not told
+    with db.engine.begin() as connection:
+        connection.execute(
+            update(Teacher).where(Teacher.course_code == code)
+            .values(total_classes=Teacher.total_classes + 1, **Teacher.version_bump())
+        )
+    db.session.rollback()
+
+    assert services.get_course_attendance_stats(code)['total_classes'] == first['total_classes'] + 1
+    assert stats_cache.misses - misses == 2
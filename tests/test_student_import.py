@@ -0,0 +1,84 @@
+import io
+
+import pytest
+
+from models import Student
+from services import _iter_json_students
+
+
+def _import(app, code, body, content_type='text/csv'):
+    return app.test_client().post(
+        f'/api/teacher/courses/{code}/students/import', data=body, content_type=content_type
+    )
+
+
+@pytest.mark.parametrize('row, error', [
+    ('A' * 13 + ',Student', 'Row 2: roll_no is longer than 12 characters'),
+    ('B1,' + 'x' * 71, 'Row 2: name is longer than 70 characters'),
+    ('  ,Student', 'Row 2: name and roll_no are required'),
+    ('B1,   ', 'Row 2: name and roll_no are required'),
+])
+def test_invalid_rows_are_rejected_before_anything_is_written(app, make_course, row, error):
+    code = make_course(['teacher@example.com'])
+
+    response = _import(app, code, f'roll_no,name\nA1,Student A\n{row}\n')
+
+    assert response.status_code == 400
+    assert response.get_json() == {'error': error}
+    with app.app_context():
+        assert Student.query.filter_by(course_code=code).count() == 0
+
+
+def test_rows_at_the_column_lengths_are_imported(app, make_course):
+    code = make_course(['teacher@example.com'])
+
+    response = _import(app, code, f'roll_no,name\n{"A" * 12}, {"x" * 70} \n')
+
+    assert response.status_code == 201
+    assert response.get_json()['inserted'] == 1
+    with app.app_context():
+        assert Student.query.filter_by(course_code=code).one().name == 'x' * 70
+
+
+def _parse(body, chunk_size=64 * 1024):
+    return list(_iter_json_students(io.BytesIO(body.encode()), chunk_size=chunk_size))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 3, 64 * 1024])
+@pytest.mark.parametrize('body, rows', [
+    ('[]', []),
+    (' [ ] \n', []),
+    ('[{"roll_no": "A1", "name": "A"}]', [{'roll_no': 'A1', 'name': 'A'}]),
+    ('\ufeff[{"roll_no": "A1"} ,\n {"roll_no": "A2"}]\n', [{'roll_no': 'A1'}, {'roll_no': 'A2'}]),
+])
+def test_json_array_is_parsed(body, rows, chunk_size):
+    assert _parse(body, chunk_size) == rows
+
+
+@pytest.mark.parametrize('chunk_size', [1, 64 * 1024])
+@pytest.mark.parametrize('body', [
+    '[{"roll_no": "A1"}{"roll_no": "A2"}]',
+    '[,{"roll_no": "A1"}]',
+    '[{"roll_no": "A1"},,{"roll_no": "A2"}]',
+    '[{"roll_no": "A1"},]',
+    '[,]',
+    '[{"roll_no": "A1"}] x',
+    '[{"roll_no": "A1"}][]',
+    '[{"roll_no": "A1"}',
+    '[{"roll_no": "A1"},',
+    '{"roll_no": "A1"}',
+    '',
+])
+def test_malformed_json_array_is_rejected(body, chunk_size):
+    with pytest.raises(ValueError):
+        _parse(body, chunk_size)
+
+
+def test_malformed_json_body_is_not_imported(app, make_course):
+    code = make_course(['teacher@example.com'])
+
+    response = _import(app, code, '[{"roll_no": "A1", "name": "A"}] {"roll_no": "A2", "name": "B"}', 'application/json')
+
+    assert response.status_code == 400
+    with app.app_context():
+        assert Student.query.filter_by(course_code=code).count() == 0
@@ -0,0 +1,43 @@
+import pytest
+
+import services
+from models import db
+
+
+@pytest.mark.parametrize('lookup', [
+    lambda email: services.get_teacher_courses(email),
+    lambda email: services.get_teacher_courses(email, with_versions=True),
+    services.get_teacher_course_versions,
+], ids=['courses', 'courses_with_versions', 'versions'])
+def test_staff_lookup_uses_the_gin_indexes(app_context, make_course, record_queries, lookup):
+    email = 'staff@example.com'
+    make_course([email])
+    make_course(['other@example.com'], [email])
+
+    with record_queries() as queries:
+        lookup(email)
+    [(statement, parameters)] = queries
+
+    # The teacher table of a test database is tiny, so the planner would scan
+    # it whatever the query looks like. With sequential scans disabled it
+    # still has to use one when neither branch can use its index.
+    connection = db.session.connection()
+    connection.exec_driver_sql('SET LOCAL enable_seqscan = off')
+    plan = '\n'.join(row[0] for row in connection.exec_driver_sql('EXPLAIN ' + statement, parameters))
+    db.session.rollback()
+
+    assert 'idx_teacher_teacher_gin' in plan
+    assert 'idx_teacher_ta_gin' in plan
+    assert 'Seq Scan on teacher' not in plan
+
+
+def test_staff_lookup_finds_teacher_and_ta_courses(app_context, make_course):
+    email = 'staff@example.com'
+    taught = make_course([email])
+    assisted = make_course(['other@example.com'], [email])
+    make_course(['other@example.com'])
+
+    codes = [course['course_code'] for course in services.get_teacher_courses(email)]
+
+    assert set(codes) >= {taught, assisted}
+    assert codes == sorted(codes)